@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+'''
+emitter.py
+
+Micro-benchmark of the print-per-fragment rendering style, as f-codec
+templates do with an indentation prefix threaded through helpers, versus
+the `Emitter` buffer on a synthetic IR of nested messages.
+'''
+
+import sys
+import io
+import time
+import argparse
+from pathlib import Path
+from contextlib import redirect_stdout
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+from protoboiler import IR, Emitter, TemplateOutput, template_output
+
+#   ---------------------------------------------------------------------------
+'''
+Fill IR with a synthetic file of the given number of messages,
+each with a nested message.
+'''
+def synthetic_ir(message_count: int, field_count: int):
+    usr = '.synthetic'
+    decl = []
+    for i in range(message_count):
+        message = f'{usr}.Message{i}'
+        nested = f'{message}.Nested'
+        field_list = [{ 'name': f'field_{j}', 'type': 'INT32', 'number': j + 1, 'label': 'OPTIONAL' }
+            for j in range(field_count)]
+        IR.pool[nested] = { 'kind': 'MESSAGE', 'name': 'Nested', 'decl': [], 'field': field_list }
+        IR.pool[message] = { 'kind': 'MESSAGE', 'name': f'Message{i}', 'decl': [nested], 'field': field_list }
+        decl.append(message)
+    IR.pool[usr] = { 'kind': 'FILE', 'name': 'synthetic.proto', 'package': 'synthetic', 'decl': decl }
+    IR.decl.append(usr)
+
+#   ---------------------------------------------------------------------------
+'''
+The print-per-fragment style: the code that f-codec generates for
+lonesome f-strings with an indentation prefix.
+'''
+def message_list_print(decl, sh = ''):
+    for message, _ in decl:
+        print((lambda x: x.join(f'''
+struct {message['name']} {{\
+'''.splitlines(True)))(sh), end='')
+        message_list_print(IR.node_iter(message['decl'], 'MESSAGE'), sh + '    ')
+        for field in message['field']:
+            print((lambda x: x.join(f'''
+    int32_t {field['name']};\
+'''.splitlines(True)))(sh), end='')
+            print(f''' // {field['number']}''', end='')
+        print((lambda x: x.join(f'''
+}};
+\
+'''.splitlines(True)))(sh), end='')
+
+def render_print() -> str:
+    with io.StringIO() as buffer:
+        template_output.set(buffer)
+        with redirect_stdout(TemplateOutput()):
+            for file, _ in IR.node_iter(IR.decl, 'FILE'):
+                message_list_print(IR.node_iter(file['decl'], 'MESSAGE'))
+        return buffer.getvalue()
+
+#   ---------------------------------------------------------------------------
+'''
+The `Emitter` style.
+'''
+def message_list_emit(emit: Emitter, decl):
+    for message, _ in decl:
+        emit.line(f"struct {message['name']} {{")
+        with emit.indent():
+            message_list_emit(emit, IR.node_iter(message['decl'], 'MESSAGE'))
+            for field in message['field']:
+                emit.write(f"int32_t {field['name']};")
+                emit.write(f" // {field['number']}\n")
+        emit.line('};')
+        emit.line()
+
+def render_emit() -> str:
+    with io.StringIO() as buffer:
+        template_output.set(buffer)
+        with redirect_stdout(TemplateOutput()):
+            emit = Emitter()
+            for file, _ in IR.node_iter(IR.decl, 'FILE'):
+                message_list_emit(emit, IR.node_iter(file['decl'], 'MESSAGE'))
+            emit.flush()
+        return buffer.getvalue()
+
+#   ---------------------------------------------------------------------------
+def measure(func, repeat: int) -> tuple[float, str]:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+#   ---------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=5000, help='a number of messages')
+    parser.add_argument('--fields', type=int, default=10, help='a number of fields per message')
+    parser.add_argument('--repeat', type=int, default=5, help='a number of repetitions')
+    args = parser.parse_args()
+
+    synthetic_ir(args.messages, args.fields)
+    print_time, print_result = measure(render_print, args.repeat)
+    emit_time, emit_result = measure(render_emit, args.repeat)
+    if print_result.strip('\n') != emit_result.strip('\n'):
+        sys.exit('The rendered code differs')
+
+    print(f'{"style":<10}{"time, s":>10}')
+    print(f'{"print":<10}{print_time:>10.3f}')
+    print(f'{"Emitter":<10}{emit_time:>10.3f}')
+    print(f'speedup: {print_time / emit_time:.2f}x, {len(emit_result) / 1024:.0f} KiB of code')
+
+#   ---------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
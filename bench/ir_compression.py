@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+'''
+ir_compression.py
+
+Benchmark of the IR file size versus the write and read time for the
+supported compression codecs and levels. Use an existing IR file produced
+by the plugin or a synthetic IR of the given size.
+'''
+
+import sys
+import json
+import time
+import tempfile
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+from protoboiler import IR, IR_CODEC, open_ir_file
+
+LEVEL_LIST = (1, 3, 6, 9)
+
+#   ---------------------------------------------------------------------------
+'''
+Fill IR with a synthetic file of the given number of messages.
+'''
+def synthetic_ir(message_count: int):
+    usr = '.synthetic'
+    decl = []
+    for i in range(message_count):
+        message = f'{usr}.Message{i}'
+        IR.pool[message] = {
+            'kind': 'MESSAGE',
+            'name': f'Message{i}',
+            'decl': [],
+            'field': [{
+                'name': f'field_{j}',
+                'type': 'STRING' if j % 2 else f'{usr}.Message{(i + j) % message_count}',
+                'number': j + 1,
+                'label': 'OPTIONAL',
+                'proto3_optional': False,
+                'leading_comments': f' Field {j} of message {i}.\n',
+            } for j in range(8)],
+        }
+        decl.append(message)
+    IR.pool[usr] = {
+        'kind': 'FILE', 'name': 'synthetic.proto', 'package': 'synthetic', 'decl': decl,
+        'options': {}, 'dependency': [],
+    }
+    IR.decl.append(usr)
+
+#   ---------------------------------------------------------------------------
+def measure(filename: Path, level: int | None) -> tuple[int, float, float]:
+    start = time.perf_counter()
+    with open_ir_file(filename, 'w', level) as f:
+        IR.dump(f)
+    dump_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open_ir_file(filename) as f:
+        json.load(f)
+    load_time = time.perf_counter() - start
+
+    return filename.stat().st_size, dump_time, load_time
+
+#   ---------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ir', type=str, help='an IR file produced by the plugin')
+    parser.add_argument('--messages', type=int, default=20000
+    , help='a number of messages in a synthetic IR')
+    args = parser.parse_args()
+
+    if args.ir:
+        with open_ir_file(args.ir) as f:
+            content = json.load(f)
+        IR.pool = content['pool']
+        IR.decl = content['decl']
+    else:
+        synthetic_ir(args.messages)
+
+    print(f'{"codec":<8}{"level":>6}{"size, KiB":>12}{"ratio":>8}{"dump, s":>10}{"load, s":>10}')
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_size, dump_time, load_time = measure(Path(tmp) / 'ir.json', None)
+        print(f'{"none":<8}{"-":>6}{plain_size / 1024:>12.1f}{1:>8.2f}{dump_time:>10.3f}{load_time:>10.3f}')
+        for suffix in IR_CODEC:
+            for level in LEVEL_LIST:
+                size, dump_time, load_time = measure(Path(tmp) / ('ir.json' + suffix), level)
+                print(f'{suffix:<8}{level:>6}{size / 1024:>12.1f}{plain_size / size:>8.2f}'
+                    f'{dump_time:>10.3f}{load_time:>10.3f}')
+
+#   ---------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,16 @@ Protocol Buffers compiler plugin to quickly generate boilerplate code
 from your Google Protocol Buffer (proto) definitions.
 '''
 
+import os
 import sys
 import json
+import base64
+import hashlib
+from types import MappingProxyType
 from pathlib import Path
-from typing import Iterator
+from typing import Iterator, Iterable, Callable, IO
+import itertools
+from collections.abc import Mapping, MutableMapping
 
 #   -----------------------------------
 #   Logging
@@ -14,13 +20,71 @@ from typing import Iterator
 
 import logging
 from logging import debug, info, warning, error, critical
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
 
 LOGGING_FORMAT = '* %(levelname)s * %(message)s'
 
+'''
+A background thread writing log records into the logging file.
+'''
+logging_listener: QueueListener | None = None
+
+#   ---------------------------------------------------------------------------
+'''
+The queue stays in-process, so a record is passed as is and its message
+is built by the file handler in the background thread.
+'''
+class LogQueueHandler(QueueHandler):
+    def prepare(self, record):
+        return record
+
 #   ---------------------------------------------------------------------------
-def init_logging(level, fn, mode = 'a'):
-    logging.basicConfig(handlers=[logging.FileHandler(fn, mode)], format=LOGGING_FORMAT
-    , level=level)
+'''
+Set up logging through a queue drained by a background thread, so that
+logging calls do not wait for file I/O.
+'''
+def init_logging(level, fn, mode = 'a', force = False):
+    global logging_listener
+
+    if logging.getLogger().handlers and not force:
+        return
+
+    stop_logging()
+    file_handler = logging.FileHandler(fn, mode)
+    file_handler.setFormatter(logging.Formatter(LOGGING_FORMAT))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logging_listener = QueueListener(log_queue, file_handler)
+    logging_listener.start()
+    logging.basicConfig(handlers=[LogQueueHandler(log_queue)], level=level, force=force)
+
+#   ---------------------------------------------------------------------------
+'''
+Write out all queued log records and stop the background thread.
+'''
+def stop_logging():
+    global logging_listener
+
+    if logging_listener:
+        logging_listener.stop()
+        for handler in logging_listener.handlers:
+            handler.close()
+        logging_listener = None
+
+#   ---------------------------------------------------------------------------
+'''
+The background thread does not exist in a forked child process,
+so log records are written into the logging file directly.
+'''
+def fork_logging():
+    if logging_listener:
+        logging.getLogger().handlers = list(logging_listener.handlers)
+
+atexit.register(stop_logging)
+#   -- fork() is not available on Windows
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=fork_logging)
 
 #   -----------------------------------
 #   Config
@@ -33,13 +97,54 @@ CONFIG_POOL = {
     'LOGGING_LEVEL': logging.INFO,
     'LOGGING_FILE': 'protoboiler.log',
     'IR_FILE': 'ir.json',
+#   -- a compression level of IR_FILE ending in .gz, .xz or .bz2 (None - codec default)
+    'IR_COMPRESSION_LEVEL': None,
+#   -- save IR_FILE with an index to read nodes lazily via mmap
+    'IR_INDEXED': False,
     'TEMPLATE_LIST': ('*.*.py', ),
+#   -- a wall-clock budget of a template render in seconds (None - unlimited)
+    'TEMPLATE_TIMEOUT': None,
+#   -- an address space budget of a template render in bytes (None - unlimited)
+    'TEMPLATE_MEMORY_LIMIT': None,
+#   -- names of helper modules imported by templates that stay loaded between renders
+    'SHARED_MODULE_LIST': (),
+#   -- list[tuple[templ, command]], a command to post-process outputs of the templates
+    'POSTPROCESS_LIST': (),
+#   -- a maximum number of concurrent post-processing commands (None - a number of CPUs)
+    'POSTPROCESS_WORKERS': None,
+#   -- a directory to cache post-processing results (None - no caching)
+    'POSTPROCESS_CACHE': None,
+#   -- a content-addressed directory to cache template renders (None - no caching)
+    'RENDER_CACHE': None,
+#   -- a maximum size of the render cache in bytes (None - unlimited)
+    'RENDER_CACHE_SIZE': None,
+#   -- count IR query API calls of each template and report them into the log
+    'IR_PROFILE': False,
+#   -- record a call site of every Nth IR query API call (0 - no sampling)
+    'IR_PROFILE_SAMPLE': 0,
+#   -- a subdirectory of the output directory for the generated files
+    'OUTPUT_DIR': '',
+#   -- log descriptor summaries instead of full descriptor dumps at DEBUG level
+    'LOGGING_SUMMARY': False,
 #   -- a config file directory
     'PATH': '',
 }
 
+#   ---------------------------------------------------------------------------
+def frozen(value):
+    if isinstance(value, dict):
+        return MappingProxyType({ key: frozen(value[key]) for key in value })
+
+    if isinstance(value, list):
+        return tuple(frozen(item) for item in value)
+
+    return value
+
 #   ---------------------------------------------------------------------------
 class Config(dict):
+#   -- an immutable snapshot of the resolved config and its content hash
+    snapshot: MappingProxyType | None = None
+    hash: str | None = None
 
 #   -----------------------------------
     def __init__(self, *args, **kwargs):
@@ -48,6 +153,15 @@ class Config(dict):
         args_dict['PATH'] = Path()
         self.from_dict(args_dict)
 
+#   -----------------------------------
+    '''
+    Restore default values of all parameters.
+    '''
+    def reset(self):
+        self.clear()
+        self.__dict__.clear()
+        self.__init__()
+
 #   -----------------------------------
     def from_dict(self, data):
         self.update({ key: data[key]
@@ -55,6 +169,19 @@ class Config(dict):
         self['PATH'] = Path(self['PATH'])
         for key in self:
             setattr(self, key, self[key])
+#       -- the snapshot is outdated
+        self.snapshot = None
+        self.hash = None
+
+#   -----------------------------------
+    '''
+    Freeze the resolved config into an immutable snapshot with a stable
+    content hash, that can be used as a cache key.
+    '''
+    def freeze(self):
+        content = json.dumps(self, sort_keys=True, cls=JSONEncoder)
+        self.snapshot = frozen(json.loads(content))
+        self.hash = hashlib.sha256(content.encode()).hexdigest()
 
 #   -----------------------------------
     def from_file(self, filename: str, env: dict = None):
@@ -84,11 +211,21 @@ class Opt(dict):
         self.__dict__ = self
 
 #   -----------------------------------
+    '''
+    Parse request parameters: "key=value,...". A value can contain "=",
+    a parameter without a value is set to an empty string. The "config"
+    parameter can be repeated to generate code using several config files
+    in a single run.
+    '''
     def parse(self, parameter: str):
-        if parameter:
-            self.from_dict(dict(i.split('=') for i in parameter.split(',')))
-        else:
-            self.config = None
+        pair_list = []
+        for item in parameter.split(',') if parameter else []:
+            key, _, value = item.partition('=')
+            if key.strip():
+                pair_list.append((key.strip(), value.strip()))
+        self.from_dict(dict(pair_list))
+        self.config_list = [value for key, value in pair_list if key == 'config']
+        self.config = self.config_list[0] if self.config_list else None
 
 opt = Opt()
 
@@ -103,14 +240,120 @@ from google.protobuf.descriptor_pb2 import (
     FieldDescriptorProto, EnumDescriptorProto, EnumValueDescriptorProto, SourceCodeInfo,
 )
 from google.protobuf.message import Message
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.descriptor_pool import DescriptorPool
+from google.protobuf.message_factory import GetMessageClassesForFiles
 
 #   -----------------------------------
 #   Intermediate representation (IR)
 #   -----------------------------------
 
+import gzip
+import lzma
+import bz2
+import mmap
+
+'''
+Streaming codecs of IR files by a filename extension with a name of
+their compression level argument.
+'''
+IR_CODEC: dict[str, tuple[Callable[..., IO[str]], str]] = {
+    '.gz': (gzip.open, 'compresslevel'),
+    '.xz': (lzma.open, 'preset'),
+    '.bz2': (bz2.open, 'compresslevel'),
+}
+
+#   ---------------------------------------------------------------------------
+'''
+Open an IR file for reading ('r') or writing ('w') in text mode,
+compressing it transparently according to the filename extension.
+'''
+def open_ir_file(filename, mode: str = 'r', level: int | None = None):
+    if Path(filename).suffix not in IR_CODEC:
+        return open(filename, mode, encoding='utf-8')
+
+    codec_open, level_arg = IR_CODEC[Path(filename).suffix]
+    kwargs = { level_arg: level } if level is not None and 'w' in mode else {}
+    return codec_open(filename, mode + 't', encoding='utf-8', **kwargs)
+
+#   -----------------------------------
+'''
+The indexed IR file layout:
+    IR_INDEX_MAGIC
+    a node in compact JSON, a line per node
+    ...
+    a trailer in JSON: { 'decl', 'option', 'config', 'config_hash',
+        'index': { usr: [offset, length] } }
+    an offset of the trailer, IR_INDEX_OFFSET_SIZE digits
+'''
+IR_INDEX_MAGIC = b'#protoboiler-ir-index\n'
+IR_INDEX_OFFSET_SIZE = 20
+
+#   ---------------------------------------------------------------------------
+'''
+IR pool that decodes nodes of a memory-mapped indexed IR file on access
+and caches decoded nodes.
+'''
+class LazyPool(MutableMapping):
+
+#   -----------------------------------
+    def __init__(self, buffer: mmap.mmap, index: dict):
+        self.buffer = buffer
+        self.index = index
+        self.cache: dict = {}
+
+#   -----------------------------------
+    def __getitem__(self, usr: str) -> dict:
+        node = self.cache.get(usr)
+        if node is None:
+            offset, length = self.index[usr]
+            node = self.cache[usr] = json.loads(self.buffer[offset:offset + length])
+        return node
+
+#   -----------------------------------
+    def __setitem__(self, usr: str, node: dict):
+        self.cache[usr] = node
+        if usr not in self.index:
+            self.index[usr] = None
+
+#   -----------------------------------
+    def __delitem__(self, usr: str):
+        del self.index[usr]
+        self.cache.pop(usr, None)
+
+#   -----------------------------------
+    def __contains__(self, usr) -> bool:
+        return usr in self.index
+
+#   -----------------------------------
+    def __iter__(self):
+        return iter(self.index)
+
+#   -----------------------------------
+    def __len__(self) -> int:
+        return len(self.index)
+
+#   ---------------------------------------------------------------------------
 class IR:
-    pool: dict = {}
+    pool: MutableMapping = {}
     decl: list = []
+#   -- an option name -> USRs of declarations that set the option
+    option: dict = {}
+#   -- dependency graphs and their derivatives computed for the loaded IR
+    graph_cache: dict = {}
+#   -- original methods of the query API replaced with counting wrappers
+    instrumented: dict = {}
+
+#   -----------------------------------
+    '''
+    Clear IR before translating a new request.
+    '''
+    @staticmethod
+    def reset():
+        IR.pool = {}
+        IR.decl = []
+        IR.option = {}
+        IR.graph_cache = {}
 
 #   -----------------------------------
     '''
@@ -118,15 +361,21 @@ class IR:
     '''
     @staticmethod
     def open(filename: str):
-        with open(filename, encoding='utf-8') as f:
-            content = json.load(f)
+        content = IR.open_indexed(filename)
+        if content is None:
+            with open_ir_file(filename) as f:
+                content = json.load(f)
 
         IR.pool = content['pool']
         IR.decl = content['decl']
+        IR.option = content.get('option', {})
+        IR.graph_cache = {}
 
-#       -- also loading global setting
-        config.from_dict(content['config'])
-        init_logging(config.LOGGING_LEVEL, config.PATH / config.LOGGING_FILE, 'a')
+#       -- also loading global setting, unless it is already resolved by the plugin
+        if config.hash is None or content.get('config_hash') != config.hash:
+            config.from_dict(content['config'])
+            config.freeze()
+            init_logging(config.LOGGING_LEVEL, config.PATH / config.LOGGING_FILE, 'a')
 
 #   -----------------------------------
     '''
@@ -134,9 +383,68 @@ class IR:
     '''
     @staticmethod
     def dump(f):
-        return json.dump({ 'pool': IR.pool, 'decl': IR.decl, 'config': config.__dict__ }, f
+        return json.dump({ 'pool': IR.pool, 'decl': IR.decl, 'option': IR.option
+        , 'config': dict(config), 'config_hash': config.hash }, f
         , indent=4, cls=JSONEncoder)
 
+#   -----------------------------------
+    '''
+    Map an indexed IR file into memory and load its trailer, nodes of
+    the pool are decoded on access. Return None if the file is not indexed.
+    '''
+    @staticmethod
+    def open_indexed(filename: str) -> dict | None:
+        if Path(filename).suffix in IR_CODEC:
+            return None
+
+        with open(filename, 'rb') as f:
+            if f.read(len(IR_INDEX_MAGIC)) != IR_INDEX_MAGIC:
+                return None
+
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        offset = int(buffer[-IR_INDEX_OFFSET_SIZE:])
+        content = json.loads(buffer[offset:-IR_INDEX_OFFSET_SIZE])
+        content['pool'] = LazyPool(buffer, content.pop('index'))
+        return content
+
+#   -----------------------------------
+    '''
+    Serialize IR and global configuration into an indexed IR file
+    opened in binary mode.
+    '''
+    @staticmethod
+    def dump_indexed(f):
+        f.write(IR_INDEX_MAGIC)
+        offset = len(IR_INDEX_MAGIC)
+        index = {}
+        for usr, node in IR.pool.items():
+            data = IR.canonical(node) + b'\n'
+            f.write(data)
+            index[usr] = (offset, len(data))
+            offset += len(data)
+        f.write(json.dumps({ 'decl': IR.decl, 'option': IR.option, 'config': dict(config)
+        , 'config_hash': config.hash, 'index': index }, cls=JSONEncoder).encode())
+        f.write(b'%0*d' % (IR_INDEX_OFFSET_SIZE, offset))
+
+#   -----------------------------------
+    '''
+    Serialize a node into a canonical compact JSON form.
+    '''
+    @staticmethod
+    def canonical(node: dict) -> bytes:
+        return json.dumps(node, sort_keys=True, separators=(',', ':'), cls=JSONEncoder).encode()
+
+#   -----------------------------------
+    '''
+    Get a content hash of IR.
+    '''
+    @staticmethod
+    def digest() -> str:
+        content = json.dumps({ 'pool': IR.pool, 'decl': IR.decl, 'option': IR.option }
+        , sort_keys=True, separators=(',', ':'), cls=JSONEncoder)
+        return hashlib.sha256(content.encode()).hexdigest()
+
 #   -----------------------------------
     '''
     Iterate over filtered declaration USRs.
@@ -194,14 +502,297 @@ class IR:
         func = lambda usr: IR.lookup(usr)[field] == value
         return func if usr is None else func(usr)
 
+#   -----------------------------------
+    '''
+    Get USRs of declarations that set the option, like "deprecated"
+    or "(package.custom_option)".
+    '''
+    @staticmethod
+    def option_usr_list(name: str) -> list[str]:
+        return IR.option.get(name, [])
+
+#   -----------------------------------
+    @staticmethod
+    def if_option(name, usr = None):
+        func = lambda usr: name in IR.lookup(usr).get('options', {})
+        return func if usr is None else func(usr)
+
+#   -----------------------------------
+    '''
+    Get a file-level dependency graph: .proto filename -> its imports.
+    '''
+    @staticmethod
+    def file_graph() -> dict[str, list[str]]:
+        if 'file' not in IR.graph_cache:
+            IR.graph_cache['file'] = { file['name']: file['dependency']
+                for file, _ in IR.node_iter(IR.decl, 'FILE') }
+
+        return IR.graph_cache['file']
+
+#   -----------------------------------
+    '''
+    Get a type-level dependency graph: USR of a message, a service or
+    a method -> USRs of messages and enums it refers to.
+    '''
+    @staticmethod
+    def type_graph() -> dict[str, list[str]]:
+        if 'type' not in IR.graph_cache:
+            graph = {}
+            for usr, node in IR.pool.items():
+                if node['kind'] == 'MESSAGE':
+                    ref_list = IR.field_type_list(node['field'])
+                elif node['kind'] == 'METHOD':
+                    ref_list = [node['input'], node['output']]
+                elif node['kind'] == 'SERVICE':
+                    ref_list = [ref for method, _ in IR.node_iter(node['decl'])
+                        for ref in (method['input'], method['output'])]
+                else:
+                    continue
+                graph[usr] = list(dict.fromkeys(ref for ref in ref_list if ref in IR.pool))
+            IR.graph_cache['type'] = graph
+
+        return IR.graph_cache['type']
+
+#   -----------------------------------
+    '''
+    Get a kind of the graph if it is made by `file_graph()` or `type_graph()`,
+    only results over these graphs are cached, other graphs are processed
+    on each call.
+    '''
+    @staticmethod
+    def graph_kind(graph: dict) -> str | None:
+        for kind in ('file', 'type'):
+            if IR.graph_cache.get(kind) is graph:
+                return kind
+
+        return None
+
+#   -----------------------------------
+    @staticmethod
+    def field_type_list(field_list: list) -> list[str]:
+        return [ref for field in field_list
+            for ref in (IR.field_type_list(field['field']) if field['type'] == 'ONEOF' else [field['type']])]
+
+#   -----------------------------------
+    '''
+    Get strongly connected components of a dependency graph, the components
+    are ordered so that dependencies come first.
+    '''
+    @staticmethod
+    def component_list(graph: dict) -> list[list[str]]:
+        kind = IR.graph_kind(graph)
+        key = ('component', kind)
+        if kind and key in IR.graph_cache:
+            return IR.graph_cache[key]
+
+#       -- Tarjan's algorithm without recursion
+        index: dict = {}
+        low: dict = {}
+        stack: list = []
+        on_stack: set = set()
+        result = []
+        for root in graph:
+            if root in index:
+                continue
+
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(graph.get(root, ())))]
+            while work:
+                node, succ_iter = work[-1]
+                for succ in succ_iter:
+                    if succ not in index:
+                        index[succ] = low[succ] = len(index)
+                        stack.append(succ)
+                        on_stack.add(succ)
+                        work.append((succ, iter(graph.get(succ, ()))))
+                        break
+
+                    if succ in on_stack:
+                        low[node] = min(low[node], index[succ])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            item = stack.pop()
+                            on_stack.discard(item)
+                            component.append(item)
+                            if item == node:
+                                break
+                        result.append(component)
+
+        if kind:
+            IR.graph_cache[key] = result
+        return result
+
+#   -----------------------------------
+    '''
+    Order nodes of a dependency graph so that dependencies come first,
+    nodes of a cycle are placed next to each other.
+    '''
+    @staticmethod
+    def topological_order(graph: dict) -> list[str]:
+        return [node for component in IR.component_list(graph) for node in component]
+
+#   -----------------------------------
+    '''
+    Get dependency cycles of a graph.
+    '''
+    @staticmethod
+    def cycle_list(graph: dict) -> list[list[str]]:
+        return [component for component in IR.component_list(graph)
+            if len(component) > 1 or component[0] in graph.get(component[0], ())]
+
+#   -----------------------------------
+    '''
+    Get all direct and indirect dependencies of a node.
+    '''
+    @staticmethod
+    def dependency_closure(graph: dict, node: str) -> set[str]:
+        kind = IR.graph_kind(graph)
+        key = ('closure', kind, node)
+        if kind and key in IR.graph_cache:
+            return IR.graph_cache[key]
+
+        result: set = set()
+        pending = list(graph.get(node, ()))
+        while pending:
+            item = pending.pop()
+            if item not in result:
+                result.add(item)
+                pending.extend(graph.get(item, ()))
+        if kind:
+            IR.graph_cache[key] = result
+        return result
+
 #   ---------------------------------------------------------------------------
 class JSONEncoder(json.JSONEncoder):
     def default(self, o):
         if isinstance(o, Path):
             return str(o)
 
+        if isinstance(o, Mapping):
+            return dict(o)
+
         return super().default(o)
 
+#   -----------------------------------
+#   IR instrumentation
+#   -----------------------------------
+
+from contextvars import ContextVar
+from collections import Counter
+from types import FrameType
+
+#   ---------------------------------------------------------------------------
+'''
+Counters of the IR query API usage by a template.
+'''
+class IRProfile:
+
+#   -----------------------------------
+    def __init__(self, sample: int = 0):
+        self.call: Counter = Counter()
+        self.iteration = 0
+        self.filter = 0
+        self.sample = sample
+        self.site: Counter = Counter()
+
+#   -----------------------------------
+    def count(self, method: str):
+        self.call[method] += 1
+        if self.sample and self.call.total() % self.sample == 0:
+#           -- find the nearest caller outside of this module
+            frame: FrameType | None = sys._getframe(2)
+            while frame and frame.f_code.co_filename == __file__:
+                frame = frame.f_back
+            if frame:
+                self.site[f'{frame.f_code.co_filename}:{frame.f_lineno}'] += 1
+
+#   -----------------------------------
+    def iterate(self, usr_iter: Iterator[str]) -> Iterator[str]:
+        for usr in usr_iter:
+            self.iteration += 1
+            yield usr
+
+#   -----------------------------------
+    def counted_filter(self, filter) -> Callable[[str], bool]:
+        def func(usr):
+            self.filter += 1
+            return IR.if_kind(filter, usr) if isinstance(filter, str) else \
+                IR.if_kind_in(filter, usr) if isinstance(filter, set) else filter(usr)
+
+        return func
+
+#   -----------------------------------
+    def report(self, name: str):
+        info('IR usage by "%s": lookup %d, usr_iter %d, node_iter %d, iterations %d'
+        ', filter evaluations %d', name, self.call['lookup'], self.call['usr_iter']
+        , self.call['node_iter'], self.iteration, self.filter)
+        for site, count in self.site.most_common(10):
+            info('    %s: %d sampled calls', site, count)
+
+'''
+Counters of the template rendered in the current asyncio task.
+'''
+ir_profile: ContextVar[IRProfile | None] = ContextVar('ir_profile', default=None)
+
+#   ---------------------------------------------------------------------------
+'''
+Replace the IR query API with counting wrappers, the API is left intact
+unless the instrumentation is enabled. Only calls made by templates are
+counted: the API calls itself through the wrappers too, e.g. `IR.node_iter()`
+calls `IR.lookup()`, so calls from this module are passed through.
+'''
+def instrument_ir():
+    if IR.instrumented:
+        return
+
+    IR.instrumented = { name: IR.__dict__[name] for name in ('lookup', 'usr_iter', 'node_iter') }
+    lookup = IR.lookup
+    usr_iter = IR.usr_iter
+    node_iter = IR.node_iter
+
+    def profiled_lookup(usr: str) -> dict:
+        profile = ir_profile.get()
+        if profile and sys._getframe(1).f_code.co_filename != __file__:
+            profile.count('lookup')
+        return lookup(usr)
+
+    def profiled_usr_iter(decl, *filter_list) -> Iterator[str]:
+        profile = ir_profile.get()
+        if profile is None or sys._getframe(1).f_code.co_filename == __file__:
+            return usr_iter(decl, *filter_list)
+
+        profile.count('usr_iter')
+        return profile.iterate(usr_iter(decl, *(profile.counted_filter(filter) for filter in filter_list)))
+
+    def profiled_node_iter(decl, *filter_list) -> Iterator[tuple[dict, str]]:
+        profile = ir_profile.get()
+        if profile is None or sys._getframe(1).f_code.co_filename == __file__:
+            return node_iter(decl, *filter_list)
+
+        profile.count('node_iter')
+        return ((lookup(usr), usr)
+            for usr in profile.iterate(usr_iter(decl, *(profile.counted_filter(filter) for filter in filter_list))))
+
+    IR.lookup = staticmethod(profiled_lookup)
+    IR.usr_iter = staticmethod(profiled_usr_iter)
+    IR.node_iter = staticmethod(profiled_node_iter)
+
+#   ---------------------------------------------------------------------------
+'''
+Restore the IR query API replaced by `instrument_ir()`.
+'''
+def uninstrument_ir():
+    for name, method in IR.instrumented.items():
+        setattr(IR, name, method)
+    IR.instrumented = {}
+
 #   -----------------------------------
 #   Translator to IR
 #   -----------------------------------
@@ -229,7 +820,7 @@ def set_comments(node: dict, path: list[int]):
 
 #   ---------------------------------------------------------------------------
 def get_enum_value(desc: EnumValueDescriptorProto, scope: list, parent: str, path: list[int]):
-    data = { 'name': desc.name, 'number': desc.number }
+    data = { 'name': desc.name, 'number': desc.number, 'options': get_options(desc.options) }
     set_comments(data, path)
     scope.append(data)
 
@@ -240,9 +831,10 @@ def walk_enum(desc: EnumDescriptorProto, decl: list, parent: str, path: list[int
     value: list = []
     walk_list(desc.value, value, usr, path.copy(), walk_handle['enum_value'])
 
-    data = { 'kind': 'ENUM', 'name': desc.name, 'value': value }
+    data = { 'kind': 'ENUM', 'name': desc.name, 'value': value, 'options': get_options(desc.options) }
     set_comments(data, path)
     IR.pool[usr] = data
+    index_options(data, usr)
     decl.append(usr)
 
 #   ---------------------------------------------------------------------------
@@ -252,7 +844,8 @@ def get_field(desc: FieldDescriptorProto, scope: list, parent: str, path: list[i
         'type': desc.type_name or FieldDescriptorProto.Type.Name(desc.type).removeprefix('TYPE_'),
         'number': desc.number,
         'label': FieldDescriptorProto.Label.Name(desc.label).removeprefix('LABEL_'),
-        'proto3_optional': desc.proto3_optional
+        'proto3_optional': desc.proto3_optional,
+        'options': get_options(desc.options)
     }
     set_comments(data, path)
     scope.append(data)
@@ -272,9 +865,16 @@ def walk_message(desc: DescriptorProto, decl: list, parent: str, path: list[int]
         , path + [walk_handle['field']['number'], i])
     root.extend(oneof_decl)
 
-    data = { 'kind': 'MESSAGE', 'name': desc.name, 'decl': nested, 'field': root }
+    data = {
+        'kind': 'MESSAGE',
+        'name': desc.name,
+        'decl': nested,
+        'field': root,
+        'options': get_options(desc.options)
+    }
     set_comments(data, path)
     IR.pool[usr] = data
+    index_options(data, usr)
     decl.append(usr)
 
 #   ---------------------------------------------------------------------------
@@ -291,6 +891,7 @@ def walk_method(desc: MethodDescriptorProto, decl: list, parent: str, path: list
     }
     set_comments(data, path)
     IR.pool[usr] = data
+    index_options(data, usr)
     decl.append(usr)
 
 #   ---------------------------------------------------------------------------
@@ -298,9 +899,10 @@ def walk_service(desc: ServiceDescriptorProto, decl: list, parent: str, path: li
     usr = parent + '.' + desc.name
     method: list = []
     walk_list(desc.method, method, usr, path.copy(), walk_handle['method'])
-    data = { 'kind': 'SERVICE', 'name': desc.name, 'decl': method }
+    data = { 'kind': 'SERVICE', 'name': desc.name, 'decl': method, 'options': get_options(desc.options) }
     set_comments(data, path)
     IR.pool[usr] = data
+    index_options(data, usr)
     decl.append(usr)
 
 #   ---------------------------------------------------------------------------
@@ -317,17 +919,129 @@ walk_handle: dict = {
 
 #   ---------------------------------------------------------------------------
 def walk_list(data: list, decl: list, parent: str, path: list[int], handle: dict):
+    dump = logging.getLogger().isEnabledFor(logging.DEBUG)
     for i, desc in enumerate(data):
-        debug('\ntype: %s\n%s', desc.__class__.__name__, desc)
+        if dump:
+            if config.LOGGING_SUMMARY:
+                debug('type: %s, name: %s', desc.__class__.__name__, desc.name)
+            else:
+                debug('\ntype: %s\n%s', desc.__class__.__name__, desc)
         handle['func'](desc, decl, parent, path + [handle['number'], i])
 
 #   ---------------------------------------------------------------------------
+'''
+Options message classes built from the request descriptors, that know about
+custom options (extensions) declared in the processed .proto files.
+'''
+OPTIONS_CLASS: dict[str, type] = {}
+OPTIONS_POOL: DescriptorPool | None = None
+#   -- files after "descriptor.proto" serialized without source locations,
+#   -- that are not in the pool yet: { name: (data, dependency) }
+OPTIONS_FILE: dict[str, tuple[bytes, list[str]]] = {}
+
+def init_options_class():
+    global OPTIONS_CLASS, OPTIONS_POOL
+
+    OPTIONS_CLASS = {}
+    OPTIONS_POOL = None
+    OPTIONS_FILE.clear()
+
+#   ---------------------------------------------------------------------------
+def extension_list(desc) -> Iterator[FieldDescriptorProto]:
+    yield from desc.extension
+    for nested in desc.nested_type if isinstance(desc, DescriptorProto) else desc.message_type:
+        yield from extension_list(nested)
+
+#   ---------------------------------------------------------------------------
+'''
+Collect custom options declared in a .proto file, the files are expected
+to come in the order of dependencies, as protoc provides them. Custom options
+can be declared only by extending options of "descriptor.proto", so the pool
+is started with it, and only files declaring options are added with their
+dependencies. Other files after "descriptor.proto" are kept serialized
+without source locations, since a later file can depend on them.
+'''
+def add_options_file(proto_file: FileDescriptorProto):
+    global OPTIONS_POOL
+
+    if proto_file.name == 'google/protobuf/descriptor.proto':
+        OPTIONS_POOL = DescriptorPool()
+    if OPTIONS_POOL is None:
+        return
+
+    stripped = FileDescriptorProto()
+    stripped.CopyFrom(proto_file)
+    stripped.ClearField('source_code_info')
+    OPTIONS_FILE[proto_file.name] = (stripped.SerializeToString(), list(proto_file.dependency))
+    if proto_file.name != 'google/protobuf/descriptor.proto' and not any(
+        ext.extendee.startswith('.google.protobuf.') and ext.extendee.endswith('Options')
+            for ext in extension_list(proto_file)):
+        return
+
+#   -- add the file after its dependencies
+    order: list[str] = []
+    pending = [(proto_file.name, False)]
+    while pending:
+        name, visited = pending.pop()
+        if visited:
+            order.append(name)
+        elif name in OPTIONS_FILE and name not in order:
+            pending.append((name, True))
+            pending.extend((dep, False) for dep in reversed(OPTIONS_FILE[name][1]))
+    try:
+        for name in dict.fromkeys(order):
+            OPTIONS_POOL.Add(FileDescriptorProto.FromString(OPTIONS_FILE.pop(name)[0]))
+#       -- options classes resolve extensions added to the pool later
+        if proto_file.name == 'google/protobuf/descriptor.proto':
+            OPTIONS_CLASS.update(GetMessageClassesForFiles([proto_file.name], OPTIONS_POOL))
+    except Exception as e:
+        warning('Unable to resolve custom options of "%s": %s', proto_file.name, e)
+
+#   ---------------------------------------------------------------------------
+def get_option_value(desc: FieldDescriptor, value):
+    if desc.type in (FieldDescriptor.TYPE_MESSAGE, FieldDescriptor.TYPE_GROUP):
+        return get_options(value)
+
+    if desc.type == FieldDescriptor.TYPE_ENUM:
+        enum_value = desc.enum_type.values_by_number.get(value)
+        return enum_value.name if enum_value else value
+
+    if desc.type == FieldDescriptor.TYPE_BYTES:
+        return base64.b64encode(value).decode('ascii')
+
+    return value
+
+#   ---------------------------------------------------------------------------
+'''
+Translate options into a JSON-safe form:
+{ name: { 'type': ..., 'value': ... } }, where name is "(full.name)" for
+custom options, type is a field type, like "STRING", "ENUM" or "MESSAGE",
+value is a list for repeated options, an enum value name for "ENUM" type,
+a dict of the same form for "MESSAGE" type and base64 string for "BYTES" type.
+'''
 def get_options(options: Message | None) -> dict:
-#   -- TODO: save option type
-    if not options:
+    if options is None or options.ByteSize() == 0:
         return {}
 
-    return { desc.name: value for desc, value in options.ListFields() }
+    options_class = OPTIONS_CLASS.get(options.DESCRIPTOR.full_name)
+    if options_class and options.__class__ is not options_class:
+        options = options_class.FromString(options.SerializeToString())
+
+    result = {}
+    for desc, value in options.ListFields():
+        name = f'({desc.full_name})' if desc.is_extension else desc.name
+        result[name] = {
+            'type': FieldDescriptorProto.Type.Name(desc.type).removeprefix('TYPE_'),
+            'value': [get_option_value(desc, item) for item in value]
+                if desc.label == FieldDescriptor.LABEL_REPEATED else
+            get_option_value(desc, value)
+        }
+    return result
+
+#   ---------------------------------------------------------------------------
+def index_options(node: dict, usr: str):
+    for name in node['options']:
+        IR.option.setdefault(name, []).append(usr)
 
 #   ---------------------------------------------------------------------------
 def walk_file(proto_file: FileDescriptorProto, parent: str):
@@ -346,81 +1060,975 @@ def walk_file(proto_file: FileDescriptorProto, parent: str):
         'options': get_options(proto_file.options),
         'dependency': list(proto_file.dependency)
     }
+    index_options(IR.pool[usr], usr)
     IR.decl.append(usr)
 
 #   ---------------------------------------------------------------------------
-def chopping(request: plugin.CodeGeneratorRequest):
+def chopping(proto_file_list: Iterable[FileDescriptorProto]):
     global PROTO_FILE
 
-    for proto_file in request.proto_file:
+    IR.reset()
+    init_options_class()
+    for proto_file in proto_file_list:
+        add_options_file(proto_file)
         PROTO_FILE = proto_file
         walk_file(proto_file, '')
+#   -- release the last descriptor
+    PROTO_FILE = None
+    OPTIONS_FILE.clear()
 
-    info('Saving "%s"', config.PATH / config.IR_FILE)
-    with open(config.PATH / config.IR_FILE, 'w') as f:
-        IR.dump(f)
+    save_ir()
+
+#   ---------------------------------------------------------------------------
+def save_ir():
+    path = config.PATH / config.IR_FILE
+    info('Saving "%s"', path)
+#   -- IR is written into a new file, since the previous one can still be mapped
+#   -- into memory by a template, the temporary filename keeps the codec extension
+    temp_path = path.with_name(f'{path.stem}.{os.getpid()}.tmp{path.suffix}')
+    if config.IR_INDEXED and path.suffix in IR_CODEC:
+        warning('Compressed IR file cannot be indexed')
+    try:
+        if config.IR_INDEXED and path.suffix not in IR_CODEC:
+            with open(temp_path, 'wb') as f:
+                IR.dump_indexed(f)
+        else:
+            with open_ir_file(temp_path, 'w', config.IR_COMPRESSION_LEVEL) as f:
+                IR.dump(f)
+        os.replace(temp_path, path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+#   -----------------------------------
+#   Request ingestion
+#   -----------------------------------
+
+WIRE_VARINT = 0
+WIRE_I64 = 1
+WIRE_LEN = 2
+WIRE_I32 = 5
+
+#   ---------------------------------------------------------------------------
+def read_varint(stream) -> int | None:
+    result = 0
+    shift = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            if shift:
+                raise EOFError('Truncated varint')
+            return None
+
+        result |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return result
+
+        shift += 7
+
+#   ---------------------------------------------------------------------------
+def encode_varint(value: int) -> bytes:
+    result = bytearray()
+    while value >= 0x80:
+        result.append(value & 0x7F | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+#   ---------------------------------------------------------------------------
+def read_exactly(stream, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise EOFError('Truncated request')
+
+    return data
+
+#   ---------------------------------------------------------------------------
+'''
+Read a serialized `CodeGeneratorRequest` from the stream field by field:
+yield `proto_file` entries one at a time, as they are parsed, and merge
+the other fields into the request. Source file descriptors are skipped,
+since the plugin does not use them.
+'''
+def ingest_request(stream, request: plugin.CodeGeneratorRequest) -> Iterator[FileDescriptorProto]:
+    proto_file_number = plugin.CodeGeneratorRequest.PROTO_FILE_FIELD_NUMBER
+    source_file_number = plugin.CodeGeneratorRequest.SOURCE_FILE_DESCRIPTORS_FIELD_NUMBER
+    while True:
+        tag = read_varint(stream)
+        if tag is None:
+            return
+
+        number, wire_type = tag >> 3, tag & 0x07
+        if wire_type == WIRE_LEN:
+            size = read_varint(stream)
+            if size is None:
+                raise EOFError('Truncated request')
+
+            if number == proto_file_number:
+                yield FileDescriptorProto.FromString(read_exactly(stream, size))
+                continue
+
+            value = encode_varint(size) + read_exactly(stream, size)
+        elif wire_type == WIRE_VARINT:
+            varint = read_varint(stream)
+            if varint is None:
+                raise EOFError('Truncated request')
+
+            value = encode_varint(varint)
+        elif wire_type == WIRE_I64:
+            value = read_exactly(stream, 8)
+        elif wire_type == WIRE_I32:
+            value = read_exactly(stream, 4)
+        else:
+            raise ValueError(f'Unsupported wire type {wire_type} of field {number}')
+
+        if number != source_file_number:
+            request.MergeFromString(encode_varint(tag) + value)
 
 #   -----------------------------------
 #   Code generator
 #   -----------------------------------
 
-from importlib.util import spec_from_file_location, module_from_spec
+from importlib.util import spec_from_file_location, module_from_spec, find_spec
 import io
-from contextlib import redirect_stdout
+from contextlib import redirect_stdout, contextmanager
+import inspect
+import asyncio
+import time
+import multiprocessing
+import traceback
 
 #   ---------------------------------------------------------------------------
-def boiling(response: plugin.CodeGeneratorResponse):
-    for item in config.TEMPLATE_LIST:
-        if isinstance(item, str):
-            templ_mask = item
-            proto = None
+class RenderError(Exception):
+    pass
+
+#   ---------------------------------------------------------------------------
+def is_shared_module(name: str) -> bool:
+    return any(name == shared or name.startswith(shared + '.')
+        for shared in config.SHARED_MODULE_LIST)
+
+#   ---------------------------------------------------------------------------
+'''
+Provide an isolated context to execute templates: the template directories
+are available in `sys.path` only during the render, the template modules and
+helper modules loaded from the template directories are unloaded afterwards,
+except for the shared ones listed in `SHARED_MODULE_LIST`.
+'''
+@contextmanager
+def template_scope(*templ_list: Path):
+    parent_list = list(dict.fromkeys(templ.parent.absolute() for templ in templ_list))
+    saved_path = sys.path.copy()
+    saved_modules = set(sys.modules)
+#   -- add the template directories to `sys.path` so you can import modules
+    for parent in parent_list:
+        if str(parent) not in sys.path:
+            sys.path.append(str(parent))
+    try:
+        yield
+    finally:
+#       -- the modules imported from the template directories, the imports of
+#       -- concurrently rendered templates cannot be told apart
+        module_file_set = set()
+        for module in list(sys.modules.values()):
+            filename = getattr(module, '__file__', None)
+            if filename and any(Path(filename).absolute().is_relative_to(parent) for parent in parent_list):
+                module_file_set.add(Path(filename).absolute())
+        for templ in templ_list:
+            render_dependency.setdefault(templ, set()).update(module_file_set)
+        sys.path[:] = saved_path
+        for parent in parent_list:
+            if str(parent) not in sys.path:
+                sys.path_importer_cache.pop(str(parent), None)
+        for name in set(sys.modules) - saved_modules:
+            if is_shared_module(name):
+                continue
+            filename = getattr(sys.modules[name], '__file__', None)
+            if filename and any(Path(filename).absolute().is_relative_to(parent)
+                for parent in parent_list):
+                del sys.modules[name]
+
+#   -----------------------------------
+'''
+Files the rendered templates depend on: {templ: {path, ...}}, i.e. modules
+imported from the template directories and files listed in `DEPENDENCY_LIST`
+of the template, a cached render is valid while these files are unchanged.
+'''
+render_dependency: dict[Path, set[Path]] = {}
+
+#   -----------------------------------
+'''
+An output sink of the template rendered in the current asyncio task.
+'''
+template_output: ContextVar[io.StringIO] = ContextVar('template_output')
+
+'''
+A callback to emit a generated file of the template rendered in the current
+asyncio task: emit(name, insertion_point, content).
+'''
+template_emit: ContextVar[Callable[[str, str, str], None]] = ContextVar('template_emit')
+
+#   ---------------------------------------------------------------------------
+'''
+`stdout` replacement that dispatches the output of concurrently rendered
+templates into their own sinks. A sink is found by the context of the caller,
+so a worker thread of the template has to run in a copy of the render
+context, e.g. via `asyncio.to_thread()` or `contextvars.copy_context().run()`.
+'''
+class TemplateOutput(io.TextIOBase):
+    def writable(self):
+        return True
+
+    def write(self, s):
+        sink = template_output.get(None)
+        if sink is None:
+            raise RuntimeError('Template output outside of the render context, '
+                'use asyncio.to_thread() or contextvars.copy_context().run() in worker threads')
+
+        return sink.write(s)
+
+#   ---------------------------------------------------------------------------
+'''
+Redirect the template output into a separate generated file (or into
+an insertion point of a file), which is emitted into the response as soon
+as the block is completed:
+
+    for message, usr in IR.node_iter(file['decl'], 'MESSAGE'):
+        with output_file(message['name'] + '.h'):
+            ...
+'''
+@contextmanager
+def output_file(name: str, insertion_point: str = ''):
+    with io.StringIO() as buffer:
+        token = template_output.set(buffer)
+        try:
+            yield
+        finally:
+            template_output.reset(token)
+        template_emit.get()(name, insertion_point, buffer.getvalue())
+
+#   ---------------------------------------------------------------------------
+'''
+Execute a template script and return the generated content.
+The template `boiling()` function can be either a plain or a coroutine function.
+'''
+async def render_async(templ: Path, name: str, proto: str | None
+, emit: Callable[[str, str, str], None]) -> str | None:
+    spec = spec_from_file_location(name, templ)
+    if not spec:
+        error('Unable to import a template: "%s"', templ)
+        return None
+
+    start = time.monotonic()
+    profile = IRProfile(config.IR_PROFILE_SAMPLE) if config.IR_PROFILE else None
+    ir_profile.set(profile)
+    with io.StringIO() as buffer:
+        template_output.set(buffer)
+        template_emit.set(emit)
+#       -- execute the template script
+        module = module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        if inspect.iscoroutinefunction(module.boiling):
+            await module.boiling(config.PATH / config.IR_FILE, proto)
+        else:
+            module.boiling(config.PATH / config.IR_FILE, proto)
+        render_dependency.setdefault(templ, set()).update((templ.parent / path).absolute()
+            for path in getattr(module, 'DEPENDENCY_LIST', ()))
+        info('Boiled "%s" in %.3fs', name, time.monotonic() - start)
+        if profile:
+            profile.report(name)
+        return buffer.getvalue()
+
+#   ---------------------------------------------------------------------------
+'''
+Render templates concurrently in a single event loop.
+'''
+def render(batch: list[tuple[Path, str, str | None, Callable]]) -> list[str | None]:
+    async def gather():
+        return await asyncio.gather(*(render_async(*item) for item in batch))
+
+    with template_scope(*(item[0] for item in batch)), redirect_stdout(TemplateOutput()):
+        return asyncio.run(gather())
+
+#   ---------------------------------------------------------------------------
+'''
+Render a template in a child process with the memory budget applied,
+then send the result or the failure reason with its traceback back.
+'''
+def render_child(conn, templ: Path, name: str, proto: str | None):
+    try:
+        if config.TEMPLATE_MEMORY_LIMIT:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS
+            , (config.TEMPLATE_MEMORY_LIMIT, config.TEMPLATE_MEMORY_LIMIT))
+        emitted: list = []
+        content = render([(templ, name, proto, lambda *args: emitted.append(args))])[0]
+        conn.send((content, emitted, render_dependency.get(templ, set()), None, None))
+    except BaseException as e:
+        conn.send((None, [], set(), f'{e.__class__.__name__} {e}'.rstrip(), traceback.format_exc()))
+    finally:
+        conn.close()
+
+#   ---------------------------------------------------------------------------
+'''
+Stop the logging thread while forking, since forking a process with running
+threads is unsafe, the queued records are written out before.
+'''
+@contextmanager
+def logging_paused():
+    listener = logging_listener
+    if listener is None:
+        yield
+        return
+
+    listener.stop()
+    try:
+        yield
+    finally:
+        listener.start()
+
+#   ---------------------------------------------------------------------------
+'''
+Render templates concurrently in supervised child processes, each within
+the configured wall-clock and memory budgets. Child processes are forked,
+so the budgets are available only on platforms supporting "fork".
+'''
+def render_supervised(batch: list[tuple[Path, str, str | None, Callable]]) -> list[str | None]:
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        raise RenderError('Template budgets are not supported on this platform')
+
+    context = multiprocessing.get_context('fork')
+    job_list = []
+    with logging_paused():
+        for templ, name, proto, _ in batch:
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(target=render_child, args=(writer, templ, name, proto)
+            , daemon=True)
+            process.start()
+            writer.close()
+            job_list.append((reader, process, time.monotonic()))
+
+    result = []
+    try:
+        for (templ, _, _, emit), (reader, process, start) in zip(batch, job_list):
+            timeout = None if config.TEMPLATE_TIMEOUT is None \
+                else max(0, start + config.TEMPLATE_TIMEOUT - time.monotonic())
+            try:
+                if not reader.poll(timeout):
+                    raise RenderError(f'"{templ}" exceeded the time budget'
+                    f' ({time.monotonic() - start:.3f}s > {config.TEMPLATE_TIMEOUT}s)')
+
+                content, emitted, dependency, reason, trace = reader.recv()
+                render_dependency.setdefault(templ, set()).update(dependency)
+            except EOFError:
+                process.join()
+                reason, trace = f'the render process died (exit code {process.exitcode})', None
+
+            if reason:
+                if trace:
+                    error('%s', trace.rstrip())
+                raise RenderError(f'"{templ}" failed after {time.monotonic() - start:.3f}s: {reason}')
+
+            for args in emitted:
+                emit(*args)
+            result.append(content)
+    finally:
+#       -- stop the rest of renders after a failure
+        for reader, process, _ in job_list:
+            reader.close()
+            if process.is_alive() and len(result) < len(job_list):
+                process.kill()
+            process.join()
+
+    return result
+
+#   -----------------------------------
+#   Emitter
+#   -----------------------------------
+
+'''
+Indentation-aware emitter, that collects the generated code in a single
+in-memory buffer instead of printing each fragment with an indentation
+prefix threaded through helper functions:
+
+    emit = Emitter()
+    emit.line(f'struct {name} {{')
+    with emit.indent():
+        for field in message['field']:
+            emit.line(f'{look_type(field)} {field["name"]};')
+    emit.line('};')
+    emit.flush()
+'''
+class Emitter:
+
+#   -----------------------------------
+    def __init__(self, indent: str = '    '):
+        self.parts: list[str] = []
+        self.unit = indent
+        self.prefix = ''
+        self.prefix_stack: list[str] = []
+        self.line_start = True
+
+#   -----------------------------------
+    '''
+    Emit a line of code with the current indentation, or finish the current
+    line started by `write()`.
+    '''
+    def line(self, text: str = ''):
+        self.parts.append(f'{self.prefix}{text}\n' if text and self.line_start else f'{text}\n')
+        self.line_start = True
+
+#   -----------------------------------
+    '''
+    Emit a fragment of code, possibly multi-line or continuing the current
+    line, indenting the beginning of each line.
+    '''
+    def write(self, text: str):
+        if not text:
+            return
+
+        if not self.prefix:
+            self.parts.append(text)
         else:
-            templ_mask, proto = item
+            for line in text.splitlines(True):
+                if self.line_start and line != '\n':
+                    self.parts.append(self.prefix)
+                self.parts.append(line)
+                self.line_start = line.endswith('\n')
+        self.line_start = text.endswith('\n')
+
+#   -----------------------------------
+    def push(self, indent: str | None = None):
+        self.prefix_stack.append(self.prefix)
+        self.prefix += self.unit if indent is None else indent
+
+#   -----------------------------------
+    def pop(self):
+        self.prefix = self.prefix_stack.pop()
+
+#   -----------------------------------
+    @contextmanager
+    def indent(self, indent: str | None = None):
+        self.push(indent)
+        try:
+            yield self
+        finally:
+            self.pop()
+
+#   -----------------------------------
+    def getvalue(self) -> str:
+        if len(self.parts) > 1:
+            self.parts = [''.join(self.parts)]
+        return self.parts[0] if self.parts else ''
+
+#   -----------------------------------
+    '''
+    Write the collected code into the template output and clear the buffer.
+    '''
+    def flush(self):
+        sys.stdout.write(self.getvalue())
+        self.parts = []
+
+#   -----------------------------------
+#   Post-processing
+#   -----------------------------------
 
-        for templ in Path(config.PATH).glob(templ_mask):
-            generated = response.file.add()
+import shlex
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+#   ---------------------------------------------------------------------------
+'''
+Find a post-processing command for the template output.
+'''
+def postprocess_command(templ: Path) -> list[str] | None:
+    for templ_mask, command in config.POSTPROCESS_LIST:
+        if templ in expand_glob(Path(config.PATH), templ_mask):
+            return shlex.split(command) if isinstance(command, str) else list(command)
+
+    return None
+
+#   ---------------------------------------------------------------------------
+def postprocess_cache_path(command: list[str], content: str) -> Path | None:
+    if config.POSTPROCESS_CACHE is None:
+        return None
+
+    digest = hashlib.sha256('\0'.join(command + [content]).encode()).hexdigest()
+    return config.PATH / config.POSTPROCESS_CACHE / digest
+
+#   ---------------------------------------------------------------------------
+'''
+Feed the content of the generated file to the command over stdin and return
+its stdout, reusing a cached result of the same command and content.
+'''
+def postprocess(command: list[str], content: str, name: str) -> str:
+    cache_path = postprocess_cache_path(command, content)
+    if cache_path and cache_path.is_file():
+        return cache_path.read_text(encoding='utf-8')
+
+    try:
+        result = subprocess.run(command, input=content, capture_output=True, text=True
+        , encoding='utf-8', cwd=config.PATH)
+    except OSError as e:
+        raise RenderError(f'"{shlex.join(command)}" cannot post-process "{name}": {e}') from e
+
+    if result.returncode:
+        raise RenderError(f'"{shlex.join(command)}" failed to post-process "{name}"'
+        f' with exit code {result.returncode} {result.stderr.strip()}'.rstrip())
+
+    if cache_path:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        temp_path.write_text(result.stdout, encoding='utf-8')
+        temp_path.replace(cache_path)
+    return result.stdout
+
+#   ---------------------------------------------------------------------------
+'''
+Run the configured post-processing commands over the generated files
+concurrently.
+'''
+def postprocessing(batch: list[tuple[plugin.CodeGeneratorResponse.File, Path]]):
+    job_list = []
+    for generated, templ in batch:
+        command = postprocess_command(templ)
+        if command:
+            job_list.append((generated, command))
+    if not job_list:
+        return
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(config.POSTPROCESS_WORKERS) as executor:
+        future_list = [ executor.submit(postprocess, command, generated.content, generated.name)
+            for generated, command in job_list ]
+        for (generated, _), future in zip(job_list, future_list):
+            generated.content = future.result()
+    info('Post-processed %d files in %.3fs', len(job_list), time.monotonic() - start)
+
+#   -----------------------------------
+#   Render cache
+#   -----------------------------------
+
+from importlib import metadata
+
+'''
+Content-addressed store of template renders. A render is keyed by hashes
+of the template, the plugin, shared modules, IR and config, so the store
+directory can be shared between machines. An entry also records hashes of
+files the render depended on, it is used while they are unchanged.
+The least recently used entries are evicted when the store exceeds
+`RENDER_CACHE_SIZE`.
+'''
+class RenderCache:
+
+#   -----------------------------------
+    def __init__(self, path: Path, size: int | None):
+        self.path = path
+        self.size = size
+        self.ir_hash = IR.digest()
+        self.plugin_digest = RenderCache.plugin_hash()
+        self.file_digest: dict[Path, str | None] = {}
+        self.hit = 0
+        self.miss = 0
+        self.saved = 0
+
+#   -----------------------------------
+    '''
+    Hash the plugin version and source, and sources of the shared modules,
+    which can live outside of the template directories.
+    '''
+    @staticmethod
+    def plugin_hash() -> str:
+        try:
+            version = metadata.version('protoboiler')
+        except metadata.PackageNotFoundError:
+            version = ''
+        digest = hashlib.sha256(version.encode() + b'\0' + Path(__file__).read_bytes() + b'\0')
+        for name in sorted(config.SHARED_MODULE_LIST):
+            try:
+                spec = find_spec(name)
+            except (ImportError, ValueError):
+                spec = None
+            origin = spec.origin if spec and spec.has_location else None
+            digest.update(name.encode() + b'\0' + (Path(origin).read_bytes() if origin else b'') + b'\0')
+
+        return digest.hexdigest()
+
+#   -----------------------------------
+    '''
+    Hash a file content, None if the file is missing.
+    '''
+    def file_hash(self, path: Path) -> str | None:
+        path = path.absolute()
+        if path not in self.file_digest:
+            try:
+                self.file_digest[path] = hashlib.sha256(path.read_bytes()).hexdigest()
+            except OSError:
+                self.file_digest[path] = None
+
+        return self.file_digest[path]
+
+#   -----------------------------------
+    def key(self, templ: Path, proto: str | None, name: str) -> str:
+        return hashlib.sha256('\0'.join((self.file_hash(templ) or '', templ.name, proto or '', name
+        , self.ir_hash, self.plugin_digest, config.hash or '')).encode()).hexdigest()
+
+#   -----------------------------------
+    def entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / key
+
+#   -----------------------------------
+    @staticmethod
+    def entry_digest(content: str, emitted: list, dependency: dict) -> str:
+        return hashlib.sha256(json.dumps([content, emitted, dependency], sort_keys=True).encode()).hexdigest()
+
+#   -----------------------------------
+    '''
+    Get the cached content and emitted files: [(name, insertion_point, content), ...]
+    of the template render, verifying the entry by its hash and the files
+    the render depended on by their hashes. The files are recorded relative
+    to the template directory.
+    '''
+    def get(self, key: str, templ: Path) -> tuple[str, list] | None:
+        path = self.entry_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry['digest'] != RenderCache.entry_digest(entry['content'], entry['emitted']
+            , entry['dependency']):
+                raise ValueError('hash mismatch')
+        except FileNotFoundError:
+            self.miss += 1
+            return None
+        except (ValueError, KeyError) as e:
+            warning('Render cache entry "%s" is corrupted: %s', path, e)
+            path.unlink(missing_ok=True)
+            self.miss += 1
+            return None
+
+        for name, digest in entry['dependency'].items():
+            if self.file_hash(templ.parent / name) != digest:
+                debug('Render cache entry "%s" is outdated by "%s"', path, name)
+                self.miss += 1
+                return None
+
+#       -- mark the entry as recently used, unless it is already evicted by another runner
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hit += 1
+        self.saved += len(entry['content']) + sum(len(item[2]) for item in entry['emitted'])
+        return entry['content'], entry['emitted']
+
+#   -----------------------------------
+    def put(self, key: str, templ: Path, content: str, emitted: list, dependency: Iterable[Path]):
+        parent = templ.parent.absolute()
+        dependency_dict = { os.path.relpath(item.absolute(), parent): self.file_hash(item)
+            for item in dependency }
+        path = self.entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({ 'content': content, 'emitted': emitted, 'dependency': dependency_dict
+            , 'digest': RenderCache.entry_digest(content, emitted, dependency_dict) }, f)
+        temp_path.replace(path)
+
+#   -----------------------------------
+    '''
+    Remove the least recently used entries to fit the store size. The store
+    can be shared by concurrent runners, so their temporary files are kept
+    and entries removed in the meantime are skipped.
+    '''
+    def evict(self):
+        if self.size is None:
+            return
+
+        entry_list = []
+        for path in self.path.glob('*/*'):
+            if path.suffix == '.tmp':
+                continue
+
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entry_list.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entry_list)
+        for _, size, path in sorted(entry_list):
+            if total <= self.size:
+                break
+
+            path.unlink(missing_ok=True)
+            total -= size
+
+#   -----------------------------------
+    def report(self):
+        info('Render cache: %d hits, %d misses, %d bytes saved', self.hit, self.miss, self.saved)
+
+#   ---------------------------------------------------------------------------
+def output_name(name: str) -> str:
+    return (Path(config.OUTPUT_DIR) / name).as_posix() if config.OUTPUT_DIR else name
+
+#   ---------------------------------------------------------------------------
+'''
+Make a callback to emit files generated by the template into the response.
+'''
+def emitter(response: plugin.CodeGeneratorResponse, emitted: list) -> Callable[[str, str, str], None]:
+    def emit(name: str, insertion_point: str, content: str):
+        emitted.append(add_file(response, output_name(name), insertion_point, content))
+
+    return emit
+
+#   ---------------------------------------------------------------------------
+def add_file(response: plugin.CodeGeneratorResponse, name: str, insertion_point: str, content: str
+) -> plugin.CodeGeneratorResponse.File:
+    generated = response.file.add()
+    generated.name = name
+    if insertion_point:
+        generated.insertion_point = insertion_point
+    generated.content = content
+    debug('Emitted "%s"', generated.name)
+    return generated
+
+#   -----------------------------------
+#   Template plan
+#   -----------------------------------
+
+'''
+Expanded template masks: {(absolute root, mask): (mtimes of the scanned directories, matched paths)}.
+'''
+glob_cache: dict[tuple[Path, str], tuple[dict[Path, int | None], tuple[Path, ...]]] = {}
+
+'''
+Resolved template lists: {key: (expanded masks, plan)}.
+'''
+plan_cache: dict[str, tuple[tuple, list[tuple[Path, str | None, str]]]] = {}
+
+#   ---------------------------------------------------------------------------
+def mtime(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+#   ---------------------------------------------------------------------------
+'''
+List directories which content affects the mask expansion: the root and
+every directory matched by a leading part of the mask.
+'''
+def glob_dir_list(root: Path, mask: str) -> list[Path]:
+    dir_list = [root]
+    part_list = Path(mask).parent.parts
+    for i in range(1, len(part_list) + 1):
+        dir_list.extend(path for path in root.glob('/'.join(part_list[:i])) if path.is_dir())
+
+    return list(dict.fromkeys(dir_list))
+
+#   ---------------------------------------------------------------------------
+'''
+Expand a template mask relative to the root, reusing the previous expansion
+while mtimes of the scanned directories are unchanged. The cache is keyed on
+the absolute root, a relative one means another directory after `chdir()`.
+'''
+def expand_glob(root: Path, mask: str) -> tuple[Path, ...]:
+    key = (root.absolute(), mask)
+    cached = glob_cache.get(key)
+    if cached and all(mtime(path) == value for path, value in cached[0].items()):
+        return cached[1]
+
+#   -- take mtimes before scanning, so a change during the scan is noticed next time
+    mtime_dict = { path: mtime(path) for path in glob_dir_list(key[0], mask) }
+    match_list = tuple(sorted(root.glob(mask)))
+    glob_cache[key] = (mtime_dict, match_list)
+    return match_list
+
+#   ---------------------------------------------------------------------------
+'''
+Resolve `TEMPLATE_LIST` into an execution plan: [(templ, proto, name), ...],
+each mask is expanded once even if it is repeated for different protos.
+Raise `RenderError` if templates make files with the same name.
+'''
+def template_plan() -> list[tuple[Path, str | None, str]]:
+    item_list = [ (item, None) if isinstance(item, str) else tuple(item) for item in config.TEMPLATE_LIST ]
+    root = Path(config.PATH)
+    expanded = { templ_mask: expand_glob(root, templ_mask) for templ_mask, _ in item_list }
+    key = json.dumps([str(root.absolute()), config.OUTPUT_DIR, item_list])
+    cached = plan_cache.get(key)
+    if cached and cached[0] == tuple(expanded.values()):
+        return cached[1]
+
+    plan = []
+    templ_by_name: dict[str, Path] = {}
+    for templ_mask, proto in item_list:
+        for templ in expanded[templ_mask]:
             if proto:
 #               -- a .proto filename without extension with an inner extension of template
-                generated.name = Path(proto).stem + Path(templ.stem).suffix
+                name = output_name(Path(proto).stem + Path(templ.stem).suffix)
             else:
 #               -- a template filename without outer extension
-                generated.name = templ.stem
-            info('Boiling "%s" to make "%s"', templ, generated.name)
-            with io.StringIO() as buffer, redirect_stdout(buffer):
-                spec = spec_from_file_location(generated.name, templ)
-                if spec:
-#                   -- add the template directory to `sys.path`` so you can import modules
-                    parent = str(templ.parent.absolute())
-                    if parent not in sys.path:
-                        sys.path.append(parent)
-#                   -- execute the template script
-                    module = module_from_spec(spec)
-                    sys.modules[generated.name] = module
-                    spec.loader.exec_module(module)
-                    module.boiling(config.PATH / config.IR_FILE, proto)
-                    generated.content = buffer.getvalue()
-                else:
-                    error('Unable to import a template: "%s"', templ)
+                name = output_name(templ.stem)
+            if name in templ_by_name:
+                raise RenderError(f'Templates "{templ_by_name[name]}" and "{templ}" make the same file "{name}"')
+
+            templ_by_name[name] = templ
+            plan.append((templ, proto, name))
+
+    plan_cache[key] = (tuple(expanded.values()), plan)
+    return plan
+
+#   ---------------------------------------------------------------------------
+def boiling(response: plugin.CodeGeneratorResponse):
+#   -- a previous config may have left the API instrumented
+    if config.IR_PROFILE:
+        instrument_ir()
+    else:
+        uninstrument_ir()
+
+    try:
+        plan = template_plan()
+#       -- files of the previous configs are already in the response
+        made = { generated.name for generated in response.file if not generated.insertion_point }
+        for templ, _, name in plan:
+            if name in made:
+                raise RenderError(f'Template "{templ}" makes the file "{name}" already made by another config')
+    except RenderError as e:
+        critical('%s', e)
+        response.error = str(e)
+        return
+
+    batch: list[tuple[plugin.CodeGeneratorResponse.File, Path, str | None, list]] = []
+    for templ, proto, name in plan:
+        generated = response.file.add()
+        generated.name = name
+        info('Boiling "%s" to make "%s"', templ, generated.name)
+        batch.append((generated, templ, proto, []))
+
+    cache = RenderCache(config.PATH / config.RENDER_CACHE, config.RENDER_CACHE_SIZE) \
+        if config.RENDER_CACHE else None
+    render_dependency.clear()
+    pending = []
+    for generated, templ, proto, emitted in batch:
+        if cache:
+            key = cache.key(templ, proto, generated.name)
+            cached = cache.get(key, templ)
+            if cached:
+                debug('Found "%s" in the render cache', generated.name)
+                generated.content, emitted_list = cached
+                for args in emitted_list:
+                    emitted.append(add_file(response, *args))
+                continue
+        else:
+            key = None
+        pending.append((generated, templ, proto, emitted, key))
+
+    try:
+        if config.TEMPLATE_TIMEOUT is None and config.TEMPLATE_MEMORY_LIMIT is None:
+            content_list = render([ (templ, generated.name, proto, emitter(response, emitted))
+                for generated, templ, proto, emitted, _ in pending ])
+        else:
+            content_list = render_supervised([ (templ, generated.name, proto, emitter(response, emitted))
+                for generated, templ, proto, emitted, _ in pending ])
+        for (generated, templ, _, emitted, key), content in zip(pending, content_list):
+            if content is not None:
+                generated.content = content
+                if cache and key:
+                    cache.put(key, templ, content, [ (item.name, item.insertion_point, item.content)
+                        for item in emitted ], render_dependency.get(templ, ()))
+
+        postprocessing([ (generated, templ)
+            for main_generated, templ, _, emitted in batch
+                for generated in [main_generated, *emitted] if not generated.insertion_point ])
+    except RenderError as e:
+#       -- make protoc fail instead of waiting for the rest of templates
+        critical('%s', e)
+        response.error = str(e)
+        return
+    finally:
+        if cache:
+            cache.evict()
+            cache.report()
+
+#   -- drop empty main files of templates that emitted their output into separate files
+    dropped = { generated.name for generated, _, _, emitted in batch if emitted and not generated.content }
+    for i in reversed(range(len(response.file))):
+        generated = response.file[i]
+        if generated.name in dropped and not generated.content and not generated.insertion_point:
+            del response.file[i]
+
+#   -- files emitted by templates can clash with each other or with files of the previous configs
+    name_count = Counter(generated.name for generated in response.file if not generated.insertion_point)
+    for name, count in name_count.items():
+        if count > 1:
+            templ_list = [ f'"{templ}"' for main_generated, templ, _, emitted in batch
+                for generated in [main_generated, *emitted] if generated.name == name and not generated.insertion_point ]
+            if len(templ_list) < count:
+                templ_list.append('another config')
+            response.error = f'File "{name}" is made more than once by {", ".join(templ_list)}'
+            critical('%s', response.error)
+            return
+
+'''
+Duration of the plugin stages in seconds.
+'''
+stage_time: dict[str, float] = {}
 
 #   ---------------------------------------------------------------------------
 def main():
-    request = plugin.CodeGeneratorRequest.FromString(sys.stdin.buffer.read())
+    stage_time.clear()
+    start = time.monotonic()
+    request = plugin.CodeGeneratorRequest()
+    proto_file_iter = ingest_request(sys.stdin.buffer, request)
+#   -- protoc serializes request fields in order, so request parameters
+#   -- are already read when the first .proto file is met
+    first_proto_file = next(proto_file_iter, None)
     response = plugin.CodeGeneratorResponse()
     response.supported_features |= plugin.CodeGeneratorResponse.FEATURE_PROTO3_OPTIONAL
 
-    opt.parse(request.parameter)
-#   -- we expect to receive a "config" file name via request parameters
-    if opt.config:
-        config.from_file(opt.config, opt)
-    init_logging(config.LOGGING_LEVEL, config.PATH / config.LOGGING_FILE, 'w')
-    info('Request parameters: %s', opt)
-    info('Config: %s', config)
-
-    chopping(request)
-    boiling(response)
+    parameter = request.parameter
+    opt.parse(parameter)
+#   -- we expect to receive "config" file names via request parameters,
+#   -- the request is translated to IR once and then boiled for each config
+    logging_file_set = set()
+    chopped = None
+    for i, config_file in enumerate(opt.config_list or [None]):
+        config.reset()
+        if config_file:
+            config.from_file(config_file, opt)
+        config.freeze()
+#       -- configs sharing a logging file append to it
+        logging_file = (config.PATH / config.LOGGING_FILE).absolute()
+        init_logging(config.LOGGING_LEVEL, logging_file, 'a' if logging_file in logging_file_set else 'w'
+        , force=True)
+        logging_file_set.add(logging_file)
+        info('Request parameters: %s', opt)
+        info('Config: %s', dict(config))
+        info('Config hash: %s', config.hash)
+
+        stage_start = time.monotonic()
+        if i == 0:
+            chopping(itertools.chain([first_proto_file] if first_proto_file else [], proto_file_iter))
+            first_proto_file = None
+            chopped = (IR.pool, IR.decl, IR.option)
+            if request.parameter != parameter:
+                warning('Request parameters after .proto files are ignored: "%s"', request.parameter)
+        else:
+#           -- templates of the previous config could load another IR
+            IR.reset()
+            IR.pool, IR.decl, IR.option = chopped
+            save_ir()
+        stage_time['chopping'] = stage_time.get('chopping', 0) + time.monotonic() - stage_start
+
+        stage_start = time.monotonic()
+        boiling(response)
+        stage_time['boiling'] = stage_time.get('boiling', 0) + time.monotonic() - stage_start
+        if response.error:
+            break
 
     info('Writing response')
     sys.stdout.buffer.write(response.SerializeToString())
+    stage_time['total'] = time.monotonic() - start
+    info('Stage time: %s', ', '.join(f'{stage} {value:.3f}s' for stage, value in stage_time.items()))
+    stop_logging()
 
 #   ---------------------------------------------------------------------------
 if __name__ == '__main__':
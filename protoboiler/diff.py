@@ -0,0 +1,122 @@
+'''
+Compare two IR files produced by the plugin and report added, removed and
+modified declarations in JSON, so that build tooling can schedule only
+the affected template renders.
+'''
+
+import sys
+import json
+import hashlib
+import argparse
+
+from protoboiler import IR, LazyPool, open_ir_file
+
+#   ---------------------------------------------------------------------------
+'''
+Load an IR file (indexed, plain or compressed) without touching
+the global IR and configuration.
+'''
+def load(filename: str) -> dict:
+    content = IR.open_indexed(filename)
+    if content is None:
+        with open_ir_file(filename) as f:
+            content = json.load(f)
+
+    return content
+
+#   ---------------------------------------------------------------------------
+'''
+Hash each node of the pool, nodes of an indexed IR are hashed
+without decoding.
+'''
+def node_digest_map(pool) -> dict[str, str]:
+    if isinstance(pool, LazyPool):
+        return { usr: hashlib.sha1(pool.buffer[offset:offset + length - 1]).hexdigest()
+            for usr, (offset, length) in pool.index.items() }
+
+    return { usr: hashlib.sha1(IR.canonical(node)).hexdigest() for usr, node in pool.items() }
+
+#   ---------------------------------------------------------------------------
+'''
+Map USRs of declarations to names of .proto files they are declared in.
+A USR of a nested declaration is prefixed with a USR of the enclosing one,
+so only nodes that have nested declarations are decoded.
+'''
+def file_map(content: dict) -> dict[str, str]:
+    pool = content['pool']
+    parent_set = { usr.rpartition('.')[0] for usr in pool }
+    result = {}
+    for file_usr in content['decl']:
+        file = pool[file_usr]
+        pending = [file_usr]
+        while pending:
+            usr = pending.pop()
+            result[usr] = file['name']
+            if usr in parent_set:
+                node = pool[usr]
+                if node['kind'] in ('FILE', 'MESSAGE', 'SERVICE'):
+                    pending.extend(node['decl'])
+
+    return result
+
+#   ---------------------------------------------------------------------------
+def changed_key_list(old: dict, new: dict) -> list[str]:
+    return sorted(key for key in old.keys() | new.keys() if old.get(key) != new.get(key))
+
+#   ---------------------------------------------------------------------------
+'''
+Compare two IRs: {
+    'added': [usr, ...],
+    'removed': [usr, ...],
+    'modified': { usr: [changed node key, ...] },
+    'file': [.proto filename with any change, ...],
+    'config': True if the configuration is changed
+}
+'''
+def diff(old: dict, new: dict) -> dict:
+    old_digest = node_digest_map(old['pool'])
+    new_digest = node_digest_map(new['pool'])
+
+    added = sorted(new_digest.keys() - old_digest.keys())
+    removed = sorted(old_digest.keys() - new_digest.keys())
+    modified = { usr: changed_key_list(old['pool'][usr], new['pool'][usr])
+        for usr in sorted(old_digest.keys() & new_digest.keys()) if old_digest[usr] != new_digest[usr] }
+
+    old_file = file_map(old)
+    new_file = file_map(new)
+    file = { old_file[usr] for usr in removed if usr in old_file } \
+        | { new_file[usr] for usr in added if usr in new_file } \
+        | { new_file[usr] for usr in modified if usr in new_file }
+
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': modified,
+        'file': sorted(file),
+        'config': old.get('config_hash') != new.get('config_hash') or old['config'] != new['config'],
+    }
+
+#   ---------------------------------------------------------------------------
+'''
+Exit status is 0 if IRs are equal, 1 if they differ.
+'''
+def main():
+    parser = argparse.ArgumentParser(description='Compare two IR files.')
+    parser.add_argument('old_ir', type=str)
+    parser.add_argument('new_ir', type=str)
+    parser.add_argument('-o', '--output', type=str, help='a report filename (default: stdout)')
+    args = parser.parse_args()
+
+    report = diff(load(args.old_ir), load(args.new_ir))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+
+    sys.exit(1 if report['added'] or report['removed'] or report['modified'] or report['config'] else 0)
+
+#   ---------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
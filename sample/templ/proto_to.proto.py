@@ -10,6 +10,7 @@ illustrating the potential for automating modifications to existing files.
 
 from logging import debug, info, warning, error, critical
 from pathlib import Path
+import json
 from protoboiler import IR, config
 
 #   -----------------------------------
@@ -55,15 +56,35 @@ def look_label(label: str):
 def look_type(field_type: str):
     return FIELD_TYPE.get(field_type, field_type)
 
+#   ---------------------------------------------------------------------------
+def look_option_value(option_type: str, value) -> str:
+    if option_type == 'MESSAGE':
+        return '{ ' + ' '.join(
+            f'{name}: {look_option(value[name])}' for name in value) + ' }'
+
+    if option_type in ('STRING', 'BYTES'):
+        return json.dumps(value)
+
+    if option_type == 'BOOL':
+        return 'true' if value else 'false'
+
+    return str(value)
+
+#   ---------------------------------------------------------------------------
+def look_option(option) -> str:
+    if isinstance(option['value'], list):
+        return '[' + ', '.join(look_option_value(option['type'], x) for x in option['value']) + ']'
+
+    return look_option_value(option['type'], option['value'])
+
 #   ---------------------------------------------------------------------------
 '''
 Boiling a generic option list.
 '''
 def option_list(options, sh = ''):
-#   -- TODO: handle option type
     for opt in options:
         f'''
-option {opt} = "{options[opt]}";
+option {opt} = {look_option(options[opt])};
 ''' > sh
 
 #   ---------------------------------------------------------------------------
@@ -98,6 +119,7 @@ def service_list(decl, sh = ''):
 service {service['name']} {{
 ''' > sh
         trailing_comment_of(service)
+        option_list(service['options'], sh + '    ')
         for method, _ in IR.node_iter(service['decl']):
             f'''
     rpc {method['name']}({look_stream(method['client_streaming'])}{method['input']}) returns ({look_stream(method['server_streaming'])}{method['output']}) {{
@@ -123,6 +145,7 @@ def enum_list(decl, sh = ''):
 enum {enum['name']} {{
 ''' > sh
         trailing_comment_of(enum)
+        option_list(enum['options'], sh + '    ')
         for value in enum['value']:
             leading_comment_of(value, sh + '    ')
             f'''
@@ -166,6 +189,7 @@ def message_list(decl, sh = ''):
 message {message['name']} {{
 ''' > sh
         trailing_comment_of(message)
+        option_list(message['options'], sh + '    ')
         enum_list(IR.node_iter(message['decl'], 'ENUM'), sh + '    ')
         message_list(IR.node_iter(message['decl'], 'MESSAGE'), sh + '    ')
         message_field_list(message['field'], sh + '    ')
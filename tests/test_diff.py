@@ -0,0 +1,80 @@
+'''
+Tests of comparing IR files.
+'''
+
+import sys
+import copy
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).absolute().parent.parent
+
+sys.path.insert(0, str(ROOT))
+
+import protoboiler
+from protoboiler import IR
+from protoboiler import diff
+
+POOL = {
+    '.pkg': { 'kind': 'FILE', 'name': 'pkg.proto', 'decl': ['.pkg.Message', '.pkg.Service', '.pkg.Enum'] },
+    '.pkg.Message': { 'kind': 'MESSAGE', 'name': 'Message', 'decl': ['.pkg.Message.Nested'], 'field': [] },
+    '.pkg.Message.Nested': { 'kind': 'MESSAGE', 'name': 'Nested', 'decl': [], 'field': [] },
+    '.pkg.Service': { 'kind': 'SERVICE', 'name': 'Service', 'decl': ['.pkg.Service.Method'] },
+    '.pkg.Service.Method': { 'kind': 'METHOD', 'name': 'Method', 'input': '.pkg.Message', 'output': '.pkg.Message' },
+    '.pkg.Enum': { 'kind': 'ENUM', 'name': 'Enum', 'value': [] },
+}
+
+#   ---------------------------------------------------------------------------
+class DiffTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.config.reset()
+        protoboiler.config.freeze()
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+
+#   -----------------------------------
+    def dump(self, name: str, pool: dict, indexed: bool) -> dict:
+        IR.reset()
+        IR.pool = pool
+        IR.decl = ['.pkg']
+        if indexed:
+            with open(self.path / name, 'wb') as f:
+                IR.dump_indexed(f)
+        else:
+            with open(self.path / name, 'w') as f:
+                IR.dump(f)
+        return diff.load(self.path / name)
+
+#   -----------------------------------
+    def test_diff(self):
+        new_pool = copy.deepcopy(POOL)
+        new_pool['.pkg.Message.Nested']['field'] = [{ 'name': 'id', 'type': 'INT32' }]
+        new_pool['.pkg.Enum2'] = { 'kind': 'ENUM', 'name': 'Enum2', 'value': [] }
+        new_pool['.pkg']['decl'].append('.pkg.Enum2')
+        del new_pool['.pkg.Service.Method']
+        new_pool['.pkg.Service']['decl'] = []
+        for indexed in (False, True):
+            with self.subTest(indexed=indexed):
+                report = diff.diff(self.dump('old.ir', POOL, indexed), self.dump('new.ir', new_pool, indexed))
+                self.assertEqual(report, {
+                    'added': ['.pkg.Enum2'],
+                    'removed': ['.pkg.Service.Method'],
+                    'modified': { '.pkg': ['decl'], '.pkg.Message.Nested': ['field'], '.pkg.Service': ['decl'] },
+                    'file': ['pkg.proto'],
+                    'config': False,
+                })
+
+#   -----------------------------------
+    def test_file_map(self):
+        content = self.dump('ir', POOL, True)
+        self.assertEqual(diff.file_map(content), dict.fromkeys(POOL, 'pkg.proto'))
+#       -- declarations without nested ones are not decoded
+        self.assertEqual(set(content['pool'].cache), { '.pkg', '.pkg.Message', '.pkg.Service' })
+
+#   ---------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
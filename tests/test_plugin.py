@@ -0,0 +1,530 @@
+'''
+Unit tests of the plugin internals.
+'''
+
+import io
+import os
+import sys
+import shutil
+import contextlib
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).absolute().parent.parent
+
+sys.path.insert(0, str(ROOT))
+
+import protoboiler
+from protoboiler import IR, RenderError, encode_varint
+from google.protobuf.compiler import plugin_pb2 as plugin
+from google.protobuf import descriptor_pb2
+from google.protobuf.descriptor_pb2 import FileDescriptorProto, DescriptorProto, FieldDescriptorProto
+from test_regression import make_request, run_plugin
+
+def field(number: int, wire_type: int, value: bytes) -> bytes:
+    if wire_type == 2:
+        value = encode_varint(len(value)) + value
+    return encode_varint(number << 3 | wire_type) + value
+
+#   ---------------------------------------------------------------------------
+class IngestRequestTest(unittest.TestCase):
+
+#   -----------------------------------
+    def ingest(self, data: bytes) -> tuple[plugin.CodeGeneratorRequest, list[str]]:
+        request = plugin.CodeGeneratorRequest()
+        name_list = [proto_file.name for proto_file in protoboiler.ingest_request(io.BytesIO(data), request)]
+        return request, name_list
+
+#   -----------------------------------
+    def test_field_order(self):
+        proto_file = lambda name: field(15, 2, FileDescriptorProto(name=name).SerializeToString())
+        request, name_list = self.ingest(proto_file('a.proto') + field(2, 2, b'config=x')
+        + field(1, 2, b'b.proto') + proto_file('b.proto')
+#       -- source file descriptors are skipped
+        + field(17, 2, FileDescriptorProto(name='src.proto').SerializeToString())
+        + field(1, 2, b'a.proto'))
+        self.assertEqual(name_list, ['a.proto', 'b.proto'])
+        self.assertEqual(request.parameter, 'config=x')
+        self.assertEqual(list(request.file_to_generate), ['b.proto', 'a.proto'])
+        self.assertEqual(len(request.source_file_descriptors), 0)
+
+#   -----------------------------------
+    def test_unknown_field(self):
+        data = field(100, 0, encode_varint(300)) + field(101, 1, bytes(8)) + field(102, 5, bytes(4)) \
+            + field(103, 2, b'unknown') + field(2, 2, b'config=x')
+        request, name_list = self.ingest(data)
+        self.assertEqual(name_list, [])
+        self.assertEqual(request.parameter, 'config=x')
+#       -- unknown fields are kept as is
+        self.assertEqual(request.SerializeToString()
+        , plugin.CodeGeneratorRequest.FromString(data).SerializeToString())
+
+#   -----------------------------------
+    def test_truncation(self):
+        data = field(15, 2, FileDescriptorProto(name='a.proto').SerializeToString())
+        for size in range(1, len(data)):
+            with self.subTest(size=size), self.assertRaises(EOFError):
+                self.ingest(data[:size])
+        with self.assertRaises(EOFError):
+            self.ingest(encode_varint(100 << 3) + b'\x80')
+        with self.assertRaises(EOFError):
+            self.ingest(field(101, 1, bytes(7)))
+
+#   ---------------------------------------------------------------------------
+class OptionsPoolTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.init_options_class()
+
+#   -----------------------------------
+    def test_without_descriptor(self):
+        protoboiler.add_options_file(FileDescriptorProto(name='a.proto'))
+        self.assertIsNone(protoboiler.OPTIONS_POOL)
+
+#   -----------------------------------
+    def test_custom_option(self):
+        descriptor = FileDescriptorProto()
+        descriptor_pb2.DESCRIPTOR.CopyToProto(descriptor)
+        types = FileDescriptorProto(name='types.proto', package='t'
+        , message_type=[DescriptorProto(name='Http', field=[FieldDescriptorProto(name='get', number=1
+            , type=FieldDescriptorProto.TYPE_STRING, label=FieldDescriptorProto.LABEL_OPTIONAL)])])
+        opts = FileDescriptorProto(name='opts.proto', package='o'
+        , dependency=['google/protobuf/descriptor.proto', 'types.proto']
+        , extension=[FieldDescriptorProto(name='http', number=50000, type=FieldDescriptorProto.TYPE_MESSAGE
+            , type_name='.t.Http', label=FieldDescriptorProto.LABEL_OPTIONAL
+            , extendee='.google.protobuf.MethodOptions')])
+        for proto_file in (descriptor, types, FileDescriptorProto(name='unrelated.proto'), opts):
+            protoboiler.add_options_file(proto_file)
+
+#       -- only files declaring options and their dependencies are in the pool
+        protoboiler.OPTIONS_POOL.FindFileByName('types.proto')
+        with self.assertRaises(KeyError):
+            protoboiler.OPTIONS_POOL.FindFileByName('unrelated.proto')
+        self.assertEqual(list(protoboiler.OPTIONS_FILE), ['unrelated.proto'])
+
+        options = descriptor_pb2.MethodOptions.FromString(field(50000, 2, field(1, 2, b'/x')))
+        self.assertEqual(protoboiler.get_options(options)
+        , { '(o.http)': { 'type': 'MESSAGE', 'value': { 'get': { 'type': 'STRING', 'value': '/x' } } } })
+        self.assertEqual(protoboiler.get_options(descriptor_pb2.MethodOptions()), {})
+
+#   ---------------------------------------------------------------------------
+class CompressedIRTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.config.reset()
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+
+#   -----------------------------------
+    def test_round_trip(self):
+        pool = { '.pkg': { 'kind': 'FILE', 'name': 'pkg.proto', 'decl': [] } }
+        for ir_file, level in (('ir.json.gz', 1), ('ir.json.xz', 9), ('ir.json.bz2', None)):
+            with self.subTest(ir_file=ir_file, level=level):
+                protoboiler.config.reset()
+                protoboiler.config.from_dict({ 'PATH': self.path, 'IR_FILE': ir_file
+                , 'IR_COMPRESSION_LEVEL': level })
+                protoboiler.config.freeze()
+                IR.reset()
+                IR.pool = dict(pool)
+                IR.decl = ['.pkg']
+                protoboiler.save_ir()
+                self.assertNotEqual((self.path / ir_file).read_bytes()[:1], b'{')
+                IR.reset()
+                IR.open(self.path / ir_file)
+                self.assertEqual((IR.pool, IR.decl), (pool, ['.pkg']))
+
+#   -----------------------------------
+    def test_level(self):
+        protoboiler.config.from_dict({ 'PATH': self.path, 'IR_FILE': 'ir.json.gz' })
+        IR.reset()
+        IR.pool = { str(i): { 'kind': 'FILE', 'name': 'x' * 100 } for i in range(1000) }
+        size_list = []
+        for level in (0, 9):
+            protoboiler.config.from_dict({ 'IR_COMPRESSION_LEVEL': level })
+            protoboiler.save_ir()
+            size_list.append((self.path / 'ir.json.gz').stat().st_size)
+        self.assertGreater(size_list[0], size_list[1])
+
+#   ---------------------------------------------------------------------------
+class GraphTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        IR.reset()
+
+#   -----------------------------------
+    def test_graph_argument(self):
+#       -- graphs of callers are freed between calls, so their ids are reused
+        self.assertEqual(IR.topological_order({ 'a': ['b'], 'b': [] }), ['b', 'a'])
+        self.assertEqual(IR.topological_order({ 'x': ['y'], 'y': [] }), ['y', 'x'])
+        self.assertEqual(IR.cycle_list({ 'a': ['b'], 'b': [] }), [])
+        self.assertEqual(IR.cycle_list({ 'p': ['q'], 'q': ['p'] }), [['q', 'p']])
+        self.assertEqual(IR.dependency_closure({ 'a': ['b'], 'b': [] }, 'a'), { 'b' })
+        self.assertEqual(IR.dependency_closure({ 'a': ['c'] }, 'a'), { 'c' })
+        self.assertEqual(IR.graph_cache, {})
+
+#   -----------------------------------
+    def test_file_graph(self):
+        IR.decl = ['a.proto', 'b.proto']
+        IR.pool = { 'a.proto': { 'kind': 'FILE', 'name': 'a.proto', 'dependency': ['b.proto'] }
+        , 'b.proto': { 'kind': 'FILE', 'name': 'b.proto', 'dependency': [] } }
+        graph = IR.file_graph()
+        self.assertEqual(IR.topological_order(graph), ['b.proto', 'a.proto'])
+        self.assertEqual(IR.dependency_closure(graph, 'a.proto'), { 'b.proto' })
+        self.assertIn(('component', 'file'), IR.graph_cache)
+        self.assertIn(('closure', 'file', 'a.proto'), IR.graph_cache)
+#       -- an equal graph of the caller is not taken from the cache
+        self.assertEqual(IR.cycle_list(dict(graph, **{ 'b.proto': ['a.proto'] })), [['b.proto', 'a.proto']])
+
+#   ---------------------------------------------------------------------------
+class ProfileTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        self.addCleanup(protoboiler.uninstrument_ir)
+        IR.reset()
+        IR.decl = ['.a', '.b']
+        IR.pool = { '.a': { 'kind': 'FILE' }, '.b': { 'kind': 'MESSAGE' } }
+        protoboiler.instrument_ir()
+        self.profile = protoboiler.IRProfile()
+        token = protoboiler.ir_profile.set(self.profile)
+        self.addCleanup(protoboiler.ir_profile.reset, token)
+
+#   -----------------------------------
+    def test_template_call(self):
+        self.assertEqual([usr for _, usr in IR.node_iter(IR.decl, 'MESSAGE')], ['.b'])
+        self.assertEqual(list(IR.usr_iter(IR.decl, IR.if_kind('FILE'))), ['.a'])
+        IR.lookup('.a')
+#       -- calls made by the API itself are not counted
+        self.assertEqual(self.profile.call, { 'node_iter': 1, 'usr_iter': 1, 'lookup': 1 })
+        self.assertEqual(self.profile.iteration, 2)
+        self.assertEqual(self.profile.filter, 4)
+
+#   -----------------------------------
+    def test_uninstrument(self):
+        protoboiler.uninstrument_ir()
+        self.assertFalse(IR.instrumented)
+        IR.lookup('.a')
+        self.assertEqual(list(IR.usr_iter(IR.decl, 'MESSAGE')), ['.b'])
+        self.assertEqual(self.profile.call, {})
+        self.assertEqual(self.profile.iteration, 0)
+
+#   ---------------------------------------------------------------------------
+class EmitterTest(unittest.TestCase):
+
+#   -----------------------------------
+    def test_indent(self):
+        emit = protoboiler.Emitter()
+        emit.line('struct A {')
+        with emit.indent():
+            emit.line('int a;')
+            emit.line()
+            with emit.indent('  '):
+                emit.write('int b;\nint c;\n\n')
+            emit.write('int d;')
+            emit.write(' // 4\n')
+        emit.line('};')
+        self.assertEqual(emit.getvalue()
+        , 'struct A {\n    int a;\n\n      int b;\n      int c;\n\n    int d; // 4\n};\n')
+
+#   -----------------------------------
+    def test_continued_line(self):
+        emit = protoboiler.Emitter()
+        with emit.indent():
+            emit.write('call(')
+            emit.line('x)')
+            emit.line('y;')
+        self.assertEqual(emit.getvalue(), '    call(x)\n    y;\n')
+
+#   -----------------------------------
+    def test_push_pop(self):
+        emit = protoboiler.Emitter('\t')
+        emit.push()
+        emit.line('a')
+        emit.pop()
+        emit.line('b')
+        self.assertEqual(emit.getvalue(), '\ta\nb\n')
+        self.assertEqual(emit.getvalue(), '\ta\nb\n')
+
+#   -----------------------------------
+    def test_flush(self):
+        emit = protoboiler.Emitter()
+        emit.line('a')
+        with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+            emit.flush()
+            self.assertEqual(buffer.getvalue(), 'a\n')
+        self.assertEqual(emit.getvalue(), '')
+
+#   ---------------------------------------------------------------------------
+class PostprocessTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.config.reset()
+
+#   -----------------------------------
+    def test_missing_command(self):
+        with self.assertRaisesRegex(RenderError, '"no-such-formatter" .* "stub.cpp"'):
+            protoboiler.postprocess(['no-such-formatter'], 'content', 'stub.cpp')
+
+#   -----------------------------------
+    def test_failed_command(self):
+        with self.assertRaisesRegex(RenderError, '"stub.cpp" with exit code 1'):
+            protoboiler.postprocess([sys.executable, '-c', 'raise SystemExit(1)'], 'content', 'stub.cpp')
+
+#   ---------------------------------------------------------------------------
+class RenderCacheTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.config.reset()
+        IR.reset()
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+
+#   -----------------------------------
+    def test_dependency(self):
+        templ_dir = self.path / 'templ'
+        (templ_dir / 'helper').mkdir(parents=True)
+        (templ_dir / 'helper' / '__init__.py').write_text('NAME = "a"\n')
+        (templ_dir / 'data.txt').write_text('1')
+        run_log = self.path / 'run.log'
+        (templ_dir / 'stub.cpp.py').write_text('import helper\n'
+        'DEPENDENCY_LIST = ["data.txt"]\n'
+        'def boiling(ir, proto):\n'
+        f'    open({str(run_log)!r}, "a").write("x")\n'
+        '    print(helper.NAME)\n')
+        protoboiler.config.from_dict({ 'PATH': self.path, 'TEMPLATE_LIST': ['templ/*.*.py']
+        , 'RENDER_CACHE': 'cache' })
+        protoboiler.config.freeze()
+
+        def boil() -> int:
+            response = plugin.CodeGeneratorResponse()
+            protoboiler.boiling(response)
+            self.assertFalse(response.error)
+            return len(run_log.read_text())
+
+        self.assertEqual(boil(), 1)
+        self.assertEqual(boil(), 1)
+#       -- other files of the template directory do not matter
+        (templ_dir / 'other.log').write_text('changed')
+        self.assertEqual(boil(), 1)
+        (templ_dir / 'helper' / '__init__.py').write_text('NAME = "b"\n')
+        self.assertEqual(boil(), 2)
+        (templ_dir / 'data.txt').write_text('2')
+        self.assertEqual(boil(), 3)
+        self.assertEqual(boil(), 3)
+
+#   -----------------------------------
+    def test_evict(self):
+        cache = protoboiler.RenderCache(self.path, 0)
+        cache.put('ab01', self.path / 'stub.cpp.py', 'content', [], [])
+#       -- a temporary file of another runner
+        temp_path = self.path / 'ab' / 'ab02.1.tmp'
+        temp_path.write_text('')
+        cache.evict()
+        self.assertEqual(list(self.path.glob('*/*')), [temp_path])
+        self.assertIsNone(cache.get('ab01', self.path / 'stub.cpp.py'))
+
+#   ---------------------------------------------------------------------------
+@unittest.skipUnless(sys.platform == 'linux', 'budgets are checked on Linux')
+class SupervisedRenderTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.config.reset()
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+
+#   -----------------------------------
+    def render(self, **templ_dict) -> list:
+        batch = []
+        for name, source in templ_dict.items():
+            templ = self.path / f'{name}.txt.py'
+            templ.write_text(source)
+            batch.append((templ, name, None, lambda *args: None))
+        return protoboiler.render_supervised(batch)
+
+#   -----------------------------------
+    def test_concurrent(self):
+        protoboiler.config.from_dict({ 'TEMPLATE_TIMEOUT': 10 })
+        source = 'import time\ndef boiling(ir, proto):\n    time.sleep(0.5)\n    print("{}")\n'
+        start = time.monotonic()
+        self.assertEqual(self.render(a=source.format('a'), b=source.format('b')), ['a\n', 'b\n'])
+        self.assertLess(time.monotonic() - start, 0.9)
+
+#   -----------------------------------
+    def test_time_budget(self):
+        protoboiler.config.from_dict({ 'TEMPLATE_TIMEOUT': 0.2 })
+        with self.assertRaisesRegex(RenderError, '"[^"]*slow.txt.py" exceeded the time budget'):
+            self.render(slow='import time\ndef boiling(ir, proto):\n    time.sleep(10)\n')
+
+#   -----------------------------------
+    def test_memory_budget(self):
+#       -- the address space of the process plus 256 MB
+        size = int(Path('/proc/self/statm').read_text().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        protoboiler.config.from_dict({ 'TEMPLATE_MEMORY_LIMIT': size + (256 << 20) })
+        with self.assertRaisesRegex(RenderError, '"[^"]*greedy.txt.py" failed .*: MemoryError'):
+            self.render(greedy='def boiling(ir, proto):\n    data = bytearray(1 << 30)\n')
+
+#   ---------------------------------------------------------------------------
+class OutputFileTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.config.reset()
+        IR.reset()
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+
+#   -----------------------------------
+    def boil(self, **templ_dict) -> plugin.CodeGeneratorResponse:
+        for name, source in templ_dict.items():
+            (self.path / f'{name}.py').write_text('from protoboiler import output_file\n'
+            'def boiling(ir, proto):\n' + source)
+        protoboiler.config.from_dict({ 'PATH': self.path, 'TEMPLATE_LIST': ['*.py'] })
+        response = plugin.CodeGeneratorResponse()
+        protoboiler.boiling(response)
+        return response
+
+#   -----------------------------------
+    def test_emitted_file(self):
+        response = self.boil(**{ 'split.h': '    with output_file("a.h"):\n        print("a")\n'
+            '    with output_file("a.h", "scope"):\n        print("b")\n'
+        , 'whole.h': '    with output_file("b.h"):\n        print("b")\n    print("whole")\n' })
+        self.assertFalse(response.error)
+#       -- the empty main file of "split.h" is dropped
+        self.assertEqual(sorted((item.name, item.insertion_point, item.content) for item in response.file)
+        , [('a.h', '', 'a\n'), ('a.h', 'scope', 'b\n'), ('b.h', '', 'b\n'), ('whole.h', '', 'whole\n')])
+
+#   -----------------------------------
+    def test_emitted_name_clash(self):
+        response = self.boil(**{ 'a.h': '    print("a")\n'
+        , 'b.h': '    with output_file("a.h"):\n        print("b")\n' })
+        self.assertRegex(response.error, 'File "a.h" is made more than once by "[^"]*a.h.py", "[^"]*b.h.py"')
+
+#   ---------------------------------------------------------------------------
+class TemplatePlanTest(unittest.TestCase):
+
+#   -----------------------------------
+    def setUp(self):
+        protoboiler.config.reset()
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+        (self.path / 'a').mkdir()
+        (self.path / 'b').mkdir()
+
+#   -----------------------------------
+    def plan(self, *template_list) -> list[tuple[str, str | None, str]]:
+        protoboiler.config.reset()
+        protoboiler.config.from_dict({ 'PATH': self.path, 'TEMPLATE_LIST': template_list })
+        return [ (templ.relative_to(self.path).as_posix(), proto, name)
+            for templ, proto, name in protoboiler.template_plan() ]
+
+#   -----------------------------------
+    def test_same_name(self):
+        (self.path / 'a' / 'x.h.py').write_text('')
+        (self.path / 'b' / 'x.h.py').write_text('')
+        self.assertEqual(self.plan('a/*.py', ('b/*.py', 'y.proto'))
+        , [('a/x.h.py', None, 'x.h'), ('b/x.h.py', 'y.proto', 'y.h')])
+        with self.assertRaisesRegex(RenderError, '"[^"]*x.h.py" and "[^"]*x.h.py" make the same file "x.h"'):
+            self.plan('a/*.py', 'b/*.py')
+        with self.assertRaisesRegex(RenderError, 'make the same file "y.h"'):
+            self.plan(('a/*.py', 'y.proto'), ('b/*.py', 'y.proto'))
+
+#   -----------------------------------
+    def test_mtime(self):
+        (self.path / 'a' / 'x.h.py').write_text('')
+        self.assertEqual(self.plan('*/*.py'), [('a/x.h.py', None, 'x.h')])
+        self.assertIs(protoboiler.template_plan(), protoboiler.template_plan())
+        (self.path / 'a' / 'z.h.py').write_text('')
+        (self.path / 'b' / 'y.h.py').write_text('')
+#       -- make the change visible on filesystems with a coarse mtime
+        for path in (self.path / 'a', self.path / 'b'):
+            os.utime(path, ns=(0, 0))
+        self.assertEqual(self.plan('*/*.py')
+        , [('a/x.h.py', None, 'x.h'), ('a/z.h.py', None, 'z.h'), ('b/y.h.py', None, 'y.h')])
+        (self.path / 'c').mkdir()
+        (self.path / 'c' / 'w.h.py').write_text('')
+        os.utime(self.path, ns=(0, 0))
+        self.assertIn(('c/w.h.py', None, 'w.h'), self.plan('*/*.py'))
+
+#   -----------------------------------
+    def test_relative_root(self):
+        (self.path / 'a' / 'x.h.py').write_text('')
+        (self.path / 'b' / 'y.h.py').write_text('')
+#       -- both directories look unchanged to a cache keyed on the relative root
+        for path in (self.path / 'a', self.path / 'b'):
+            os.utime(path, ns=(0, 0))
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        protoboiler.config.from_dict({ 'PATH': '.', 'TEMPLATE_LIST': ['*.py'] })
+        os.chdir(self.path / 'a')
+        self.assertEqual([ name for _, _, name in protoboiler.template_plan() ], ['x.h'])
+        os.chdir(self.path / 'b')
+        self.assertEqual([ name for _, _, name in protoboiler.template_plan() ], ['y.h'])
+
+#   ---------------------------------------------------------------------------
+class MultipleConfigTest(unittest.TestCase):
+
+#   -----------------------------------
+    def test_same_output(self):
+        cwd = os.getcwd()
+        os.chdir(ROOT)
+        try:
+            response, _ = run_plugin(make_request('config=sample/sample.config,config=sample/sample.config,my_opt=hello'))
+            log = (ROOT / 'sample' / 'build' / 'sample.log').read_text()
+        finally:
+            os.chdir(cwd)
+        self.assertIn('"stub.cpp" already made by another config', response.error)
+#       -- the second config appends to the shared logging file
+        self.assertEqual(log.count('Config hash:'), 2)
+
+#   -----------------------------------
+    def test_late_parameter(self):
+        path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, path)
+        cwd = os.getcwd()
+        os.chdir(path)
+        try:
+            stdin = io.TextIOWrapper(io.BytesIO(make_request('').SerializeToString()
+            + field(2, 2, b'config=sample.config')))
+            stdout = io.TextIOWrapper(io.BytesIO())
+            with mock.patch.object(sys, 'stdin', stdin), mock.patch.object(sys, 'stdout', stdout):
+                protoboiler.main()
+        finally:
+            os.chdir(cwd)
+        self.assertIn('Request parameters after .proto files are ignored: "config=sample.config"'
+        , (path / 'protoboiler.log').read_text())
+
+#   -----------------------------------
+    def test_shared_indexed_ir(self):
+        path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, path)
+        (path / 'templ').mkdir()
+        for name in ('a', 'b'):
+            (path / f'{name}.config').write_text(f'LOGGING_FILE = "{name}.log"\n'
+            'IR_FILE = "ir.json"\n'
+            'IR_INDEXED = True\n'
+            f'OUTPUT_DIR = "{name}"\n'
+            'TEMPLATE_LIST = ("templ/*.*.py", )\n')
+        (path / 'templ' / 'count.txt.py').write_text('from protoboiler import IR\n'
+        'def boiling(ir, proto):\n'
+        '    IR.open(ir)\n'
+        '    print(len(IR.decl), sorted(IR.pool)[0])\n')
+        response, _ = run_plugin(make_request(f'config={path / "a.config"},config={path / "b.config"}'))
+        self.assertFalse(response.error)
+#       -- the second config saves the chopped IR, not the one loaded by the template
+        self.assertEqual([(item.name, item.content) for item in response.file]
+        , [('a/count.txt', '2 .package1\n'), ('b/count.txt', '2 .package1\n')])
+        self.assertEqual(sorted(item.name for item in path.iterdir()), ['a.config', 'a.log', 'b.config', 'b.log'
+        , 'ir.json', 'templ'])
+
+#   ---------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()
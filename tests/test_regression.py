@@ -0,0 +1,107 @@
+'''
+Regression tests of the generated code and the plugin performance.
+
+The plugin `main()` is driven in-process with a `CodeGeneratorRequest` made
+of "data/sample.pb", a descriptor set of "sample/proto/" compiled by:
+
+    protoc --include_source_info --include_imports -Isample/proto \
+        -o tests/data/sample.pb sample/proto/*.proto
+
+The generated files are compared with "golden/" files, stage timings are
+compared with "baseline.json" within a tolerance. To update golden files
+and baselines, run the tests with PROTOBOILER_UPDATE=1.
+'''
+
+import io
+import os
+import sys
+import json
+import statistics
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).absolute().parent.parent
+TESTS = Path(__file__).absolute().parent
+GOLDEN = TESTS / 'golden'
+BASELINE = TESTS / 'baseline.json'
+
+sys.path.insert(0, str(ROOT))
+
+import protoboiler
+from google.protobuf.compiler import plugin_pb2 as plugin
+from google.protobuf.descriptor_pb2 import FileDescriptorSet
+
+UPDATE = bool(os.environ.get('PROTOBOILER_UPDATE'))
+
+#   -- a number of plugin runs to measure stage timings
+RUN_COUNT = 5
+#   -- a stage may take TOLERANCE times longer than the baseline plus SLACK seconds
+TOLERANCE = 2.0
+SLACK = 0.05
+
+#   ---------------------------------------------------------------------------
+def make_request(parameter: str) -> plugin.CodeGeneratorRequest:
+    descriptor_set = FileDescriptorSet.FromString((TESTS / 'data' / 'sample.pb').read_bytes())
+    request = plugin.CodeGeneratorRequest(parameter=parameter)
+    request.file_to_generate.extend(proto_file.name for proto_file in descriptor_set.file)
+    request.proto_file.extend(descriptor_set.file)
+    return request
+
+#   ---------------------------------------------------------------------------
+'''
+Run the plugin in-process, return the response and stage timings.
+'''
+def run_plugin(request: plugin.CodeGeneratorRequest) -> tuple[plugin.CodeGeneratorResponse, dict]:
+    stdin = io.TextIOWrapper(io.BytesIO(request.SerializeToString()))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    with mock.patch.object(sys, 'stdin', stdin), mock.patch.object(sys, 'stdout', stdout):
+        protoboiler.main()
+    return plugin.CodeGeneratorResponse.FromString(stdout.buffer.getvalue()), dict(protoboiler.stage_time)
+
+#   ---------------------------------------------------------------------------
+class RegressionTest(unittest.TestCase):
+
+#   -----------------------------------
+    @classmethod
+    def setUpClass(cls):
+        cwd = os.getcwd()
+        os.chdir(ROOT)
+        try:
+            request = make_request('config=sample/sample.config,my_opt=hello')
+            cls.response, timing = run_plugin(request)
+            timing_list = [timing] + [run_plugin(request)[1] for _ in range(RUN_COUNT - 1)]
+        finally:
+            os.chdir(cwd)
+        cls.timing = { stage: statistics.median(timing[stage] for timing in timing_list)
+            for stage in timing_list[0] }
+
+#   -----------------------------------
+    def test_generated_code(self):
+        self.assertFalse(self.response.error)
+        generated = { file.name: file.content for file in self.response.file }
+        if UPDATE:
+            for path in GOLDEN.iterdir():
+                path.unlink()
+            for name, content in generated.items():
+                (GOLDEN / name).write_text(content, encoding='utf-8')
+
+        self.assertEqual(sorted(generated), sorted(path.name for path in GOLDEN.iterdir()))
+        for name, content in generated.items():
+            with self.subTest(name=name):
+                self.assertEqual(content, (GOLDEN / name).read_text(encoding='utf-8'))
+
+#   -----------------------------------
+    def test_stage_timing(self):
+        if UPDATE:
+            BASELINE.write_text(json.dumps(self.timing, indent=4) + '\n', encoding='utf-8')
+
+        baseline = json.loads(BASELINE.read_text(encoding='utf-8'))
+        for stage, limit in baseline.items():
+            with self.subTest(stage=stage):
+                self.assertLessEqual(self.timing[stage], limit * TOLERANCE + SLACK
+                , f'"{stage}" stage is slower than the baseline ({limit:.3f}s)')
+
+#   ---------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()